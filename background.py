@@ -0,0 +1,106 @@
+"""
+Solving on a worker thread, for the GUI.
+
+BackgroundSolve runs schedule_backtrack on a daemon thread so the Tk main
+loop keeps drawing while it searches. Timetable log records are forwarded
+into a queue (see logs.forward); the GUI calls poll() from root.after()
+to drain it, which also refreshes the progress counters: classes done,
+nodes explored and the optimizer's best cost so far. A counter the solve
+cannot fill is None: classes_done outside a sequential single solve, and
+nodes across parallel attempts, which report attempts_done instead.
+
+cancel() sets the event in the solve's SearchBudget, which every search
+stage checks, so the worker stops within a few hundred nodes. A solve that
+fails or is cancelled puts back the timetables the school had before.
+"""
+import queue
+import threading
+from scheduler import SearchBudget
+from logs import forward, get_logger
+from config import BACKTRACK_SETTINGS
+import main
+
+logger = get_logger("background")
+
+_FINISHED = object()  # Queue marker put after the solve returns
+
+
+class BackgroundSolve:
+    """One schedule_backtrack call on a worker thread"""
+
+    def __init__(self, school, **options):
+        self.school = school
+        self.options = options  # Passed on to schedule_backtrack
+        self.mode = options.get('mode') or BACKTRACK_SETTINGS['mode']
+        self.attempts = options.get('attempts') or BACKTRACK_SETTINGS['parallel_attempts']
+        self.cancel_event = threading.Event()
+        self.budget = SearchBudget(cancel=self.cancel_event)
+        self.records = queue.Queue()
+        self.previous = main.serialize_timetables(school)
+        self.result = None
+        self.finished = False
+        self.best_cost = None
+        self.finished_attempts = 0
+        self.thread = threading.Thread(target=self._run, name="timetable-solve", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def nodes(self):
+        # Parallel attempts search in worker processes with budgets of their own
+        return self.budget.nodes if self.attempts <= 1 else None
+
+    @property
+    def classes_done(self):
+        # Only the sequential mode finishes classes one at a time
+        if self.attempts > 1 or self.mode != 'sequential':
+            return None
+        return len(self.budget.metrics.classes)
+
+    @property
+    def attempts_done(self):
+        return self.finished_attempts if self.attempts > 1 else None
+
+    def _run(self):
+        with forward(self.records):
+            try:
+                # Start from empty timetables with fresh faculty occupancy and freshness
+                for class_obj in self.school.classes:
+                    class_obj.timetable = {}
+                main.init_availability_scores(self.school)
+                self.result = main.schedule_backtrack(self.school, budget=self.budget, **self.options)
+            except Exception:
+                logger.exception("Background solve failed")
+            if not self.result or self.cancelled:
+                main.apply_timetables(self.school, self.previous)
+        self.records.put(_FINISHED)
+
+    def poll(self):
+        """Records logged since the last call; sets finished once the worker is done"""
+        records = []
+        while True:
+            try:
+                record = self.records.get_nowait()
+            except queue.Empty:
+                break
+            if record is _FINISHED:
+                self.finished = True
+                break
+            fields = getattr(record, "fields", {})
+            if getattr(record, "event", None) == "parallel_attempt":
+                self.finished_attempts += 1
+            if "best_cost" in fields:
+                self.best_cost = fields["best_cost"]
+            elif "cost_after" in fields:
+                self.best_cost = fields["cost_after"]
+            records.append(record)
+        return records
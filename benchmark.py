@@ -0,0 +1,282 @@
+"""
+Benchmark suite for schedule_backtrack.
+
+Schools come from the demo roster or from synthetic_school(), which
+generates subjects, labs, faculty with overlapping qualifications and
+classes at a given size and tightness. Each (scale, tightness, engine,
+mode) case is solved once per seed, and the suite records wall time,
+nodes, search speed, success rate and timetable quality. A separate traced run of the
+first seed records peak memory with tracemalloc, because tracing slows
+the solve down.
+
+Cases a solver fails, such as the medium scale today, stay in the results
+as failing rows so that progress on them shows up; --quick skips medium
+for a run of seconds. Results are written as JSON. --compare checks them
+against an earlier results file and reports cases that got slower or
+solved fewer seeds:
+
+    python benchmark.py --scales small,medium --output new.json --compare baseline.json
+"""
+import argparse
+import json
+import logging
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from models import Class, Faculty, Labs, School, Subject
+from scheduler import SearchBudget, required_hours
+from feasibility import lab_windows_per_day, teaching_periods
+from optimizer import TimetableOptimizer
+from logs import quiet
+from config import WORKDAYS, MAX_HOURS_PER_DAY
+import main
+
+# Sections per scale; 'demo' is the roster in main.py
+SCALES = {'demo': 5, 'small': 5, 'medium': 50, 'large': 500}
+DEFAULT_SCALES = ('demo', 'small', 'medium')
+QUICK_SCALES = ('demo', 'small')  # --quick: a run of seconds rather than minutes
+
+# Share of faculty teaching hours the classes' demand uses
+TIGHTNESS = {'loose': 0.6, 'tight': 0.85}
+
+# (engine, mode) pairs to compare
+MODES = [
+    ('backtrack', 'sequential'),
+    ('csp', 'sequential'),
+    ('csp', 'simultaneous'),
+]
+
+SEEDS = [0, 1, 2]
+TIME_LIMIT = 60  # Seconds per solve
+
+
+def scaled_demo_school(copies=1):
+    """Demo roster with every class repeated `copies` times"""
+    _, faculties, demo_classes = main.demo_roster()
+    classes = []
+    for k in range(copies):
+        for class_obj in demo_classes:
+            name = class_obj.get_name() if copies == 1 else f"{class_obj.get_name()} #{k + 1}"
+            classes.append(Class(name, list(class_obj.subjects)))
+    return School(classes, faculties)
+
+
+def synthetic_school(sections, tightness=0.6, seed=0, theory_subjects=10, lab_subjects=4,
+                     theory_per_class=5, labs_per_class=2, overlap=0.3):
+    """
+    Random school of `sections` classes, each taking theory_per_class theory
+    subjects (3 or 4 credits) and labs_per_class two-period labs. Faculty are
+    added per subject until its demand uses at most `tightness` of their
+    weekly hours; for a lab that is the hours its teachers can spend in the
+    two-period windows a day offers, not the daily maximum. A share
+    `overlap` of faculty can also teach a second subject: the lab of their
+    theory subject, or another theory subject.
+    """
+    rng = random.Random(seed)
+    theory = [Subject(f"Subject {i + 1}", rng.choice([3, 4])) for i in range(theory_subjects)]
+    labs = [Labs(f"Subject {i + 1} Lab", 2, 2) for i in range(lab_subjects)]
+
+    classes = [Class(f"Section {k + 1}", rng.sample(theory, theory_per_class) + rng.sample(labs, labs_per_class))
+               for k in range(sections)]
+
+    main.ensure_time_slots()
+    periods = teaching_periods(main.BREAK_SLOTS)
+    capacity = min(MAX_HOURS_PER_DAY, len(periods)) * len(WORKDAYS)
+    demand = {subject: 0 for subject in theory + labs}
+    for class_obj in classes:
+        for subject in class_obj.subjects:
+            demand[subject] += required_hours(subject)
+
+    def weekly_hours(subject):
+        # A lab teacher is also bounded by the consecutive windows of a day
+        if isinstance(subject, Labs):
+            block = subject.get_labslots()
+            return min(capacity, lab_windows_per_day(periods, block) * block * len(WORKDAYS))
+        return capacity
+
+    faculties = []
+    for subject, hours in demand.items():
+        for k in range(max(1, math.ceil(hours / (weekly_hours(subject) * tightness)))):
+            subjects = [subject]
+            if rng.random() < overlap:
+                index = theory.index(subject) if subject in theory else None
+                if index is not None and index < lab_subjects and rng.random() < 0.5:
+                    subjects.append(labs[index])
+                else:
+                    subjects.append(rng.choice([s for s in theory if s is not subject]))
+            faculties.append(Faculty(f"{subject.get_name()} Teacher {k + 1}", subjects))
+    return School(classes, faculties)
+
+
+def build_school(scale, tightness, seed):
+    if scale == 'demo':
+        return main.demo_school()
+    return synthetic_school(SCALES[scale], TIGHTNESS[tightness], seed)
+
+
+def solve_once(scale, tightness, engine, mode, seed, time_limit, trace_memory=False):
+    """Solve one generated school; returns a dict of measurements"""
+    school = build_school(scale, tightness, seed)
+    budget = SearchBudget(time_limit=time_limit)
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with quiet(logging.CRITICAL):
+        result = main.schedule_backtrack(school, engine=engine, mode=mode, seed=seed, budget=budget,
+                                         optimize=False, use_cache=False)
+    seconds = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    shortfall, free_periods = main.timetable_quality(school)
+    return {
+        'success': bool(result),
+        'seconds': seconds,
+        'nodes': result.metrics.nodes,
+        'backtracks': result.metrics.backtracks,
+        'peak_bytes': peak,
+        'shortfall': shortfall,
+        'free_periods': free_periods,
+        # Gaps, repeated subjects and shortfall as the optimizer weighs them
+        'cost': TimetableOptimizer(school).cost() if result else None,
+    }
+
+
+def run_case(scale, tightness, engine, mode, seeds=SEEDS, time_limit=TIME_LIMIT, memory=True):
+    """Every seed of one case, summarised into one results row"""
+    runs = [solve_once(scale, tightness, engine, mode, seed, time_limit) for seed in seeds]
+    peak = None
+    if memory:
+        peak = solve_once(scale, tightness, engine, mode, seeds[0], time_limit, trace_memory=True)['peak_bytes']
+    solved = [run for run in runs if run['success']]
+
+    def mean(key, rows):
+        return round(sum(run[key] for run in rows) / len(rows), 4) if rows else None
+
+    return {
+        'scale': scale,
+        'sections': len(build_school(scale, tightness, seeds[0]).classes),
+        'tightness': tightness,
+        'engine': engine,
+        'mode': mode,
+        'runs': len(runs),
+        'solved': len(solved),
+        'success_rate': round(len(solved) / len(runs), 4),
+        'seconds_mean': mean('seconds', runs),
+        'seconds_max': round(max(run['seconds'] for run in runs), 4),
+        'nodes_mean': mean('nodes', runs),
+        # Search speed, comparable even when every seed runs into the time limit
+        'nodes_per_second': round(sum(run['nodes'] for run in runs) / sum(run['seconds'] for run in runs), 1),
+        'backtracks_mean': mean('backtracks', runs),
+        'peak_memory_mb': round(peak / 2**20, 2) if peak is not None else None,
+        'shortfall_mean': mean('shortfall', runs),
+        'free_periods_mean': mean('free_periods', runs),
+        'cost_mean': mean('cost', solved),
+    }
+
+
+def run_suite(scales, tightness_levels, modes=MODES, seeds=SEEDS, time_limit=TIME_LIMIT, memory=True):
+    """Run every case, printing a line per case; returns the results document"""
+    rows = []
+    print(f"{'scale':>7} {'sections':>8} {'tight':>6} {'engine':>10} {'mode':>13} "
+          f"{'solved':>7} {'avg ms':>9} {'nodes':>9} {'nodes/s':>9} {'peak MB':>8} {'cost':>7}")
+    for scale in scales:
+        # The demo roster has one fixed tightness
+        for tightness in (['loose'] if scale == 'demo' else tightness_levels):
+            for engine, mode in modes:
+                row = run_case(scale, tightness, engine, mode, seeds, time_limit, memory)
+                rows.append(row)
+                print(f"{scale:>7} {row['sections']:>8} {tightness:>6} {engine:>10} {mode:>13} "
+                      f"{row['solved']:>4}/{row['runs']:<2} {1000 * row['seconds_mean']:>9.1f} "
+                      f"{row['nodes_mean']:>9.0f} {row['nodes_per_second']:>9.0f} {row['peak_memory_mb'] or 0:>8.2f} "
+                      f"{row['cost_mean'] if row['cost_mean'] is not None else '-':>7}")
+    return {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'seeds': list(seeds),
+        'time_limit': time_limit,
+        'results': rows,
+    }
+
+
+def compare(baseline, current, tolerance=0.2):
+    """
+    Print cases that got slower by more than `tolerance` (a fraction) or
+    solved fewer seeds than in the baseline; returns how many regressed.
+    A case that solved no seed either time ran into the time limit, so
+    there its search speed (nodes per second) is compared instead.
+    """
+    def key(row):
+        return (row['scale'], row['tightness'], row['engine'], row['mode'])
+
+    before = {key(row): row for row in baseline['results']}
+    regressions = 0
+    for row in current['results']:
+        old = before.get(key(row))
+        if old is None:
+            continue
+        if old['solved'] or row['solved']:
+            slower = old['seconds_mean'] and row['seconds_mean'] > old['seconds_mean'] * (1 + tolerance)
+        else:
+            slower = old.get('nodes_per_second') and row['nodes_per_second'] * (1 + tolerance) < old['nodes_per_second']
+        worse = row['success_rate'] < old['success_rate']
+        if slower or worse:
+            regressions += 1
+            print(f"REGRESSION {' '.join(key(row))}: "
+                  f"{1000 * old['seconds_mean']:.1f} -> {1000 * row['seconds_mean']:.1f} ms, "
+                  f"{old.get('nodes_per_second', 0):.0f} -> {row['nodes_per_second']:.0f} nodes/s, "
+                  f"solved {old['solved']}/{old['runs']} -> {row['solved']}/{row['runs']}")
+    print(f"{regressions} regressions against the baseline")
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the timetable solvers")
+    scales = parser.add_mutually_exclusive_group()
+    scales.add_argument("--scales", help=f"comma-separated, from {', '.join(SCALES)} "
+                                         f"(default: {','.join(DEFAULT_SCALES)})")
+    scales.add_argument("--quick", action="store_true", help=f"only {','.join(QUICK_SCALES)}")
+    parser.add_argument("--tightness", default="loose,tight",
+                        help=f"comma-separated, from {', '.join(TIGHTNESS)}")
+    parser.add_argument("--modes", default=",".join(f"{engine}:{mode}" for engine, mode in MODES),
+                        help="comma-separated engine:mode pairs")
+    parser.add_argument("--seeds", default=",".join(map(str, SEEDS)), help="comma-separated seeds")
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT, help="seconds per solve")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory run")
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging")
+    return parser
+
+
+def run(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.scales:
+        scales = args.scales.split(",")
+    else:
+        scales = QUICK_SCALES if args.quick else DEFAULT_SCALES
+    results = run_suite(
+        scales,
+        args.tightness.split(","),
+        [tuple(pair.split(":")) for pair in args.modes.split(",")],
+        [int(seed) for seed in args.seeds.split(",")],
+        args.time_limit,
+        not args.no_memory,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(json.load(f), results, args.tolerance):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
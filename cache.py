@@ -0,0 +1,275 @@
+"""
+On-disk cache of solved timetables.
+
+Entries are keyed by a SHA-256 of a canonical description of everything a
+solve depends on: subjects, faculty and their absences, classes, break
+layout, faculty and lab limits, search and optimizer settings and
+budgets, solver options (engine, mode, parallel attempts, optimize) and
+the seed. An exact hit is loaded without any search. When nothing
+matches exactly, the most similar entry (Jaccard similarity of the
+described inputs) can warm-start the solve: lessons that still fit are
+kept and the repair search fills in the rest. Only seeded solves use the
+cache, since without a seed every run is meant to differ.
+
+The cache is a directory of JSON files plus an index. The least recently
+used entries are evicted once the entry count or total size goes over
+CACHE_SETTINGS.
+"""
+import hashlib
+import json
+import os
+from models import Labs, FREE_CODE
+from scheduler import required_hours
+from repair import repair
+from logs import event, get_logger
+from config import (
+    WORKDAYS,
+    HOURS_PER_DAY,
+    MAX_HOURS_PER_DAY,
+    MIN_FRESHNESS_SCORE,
+    LAB_CONSTRAINTS,
+    BACKTRACK_SETTINGS,
+    OPTIMIZER_SETTINGS,
+    CACHE_SETTINGS
+)
+
+# Settings that change which timetable a seeded solve produces; the budgets
+# count too, since a search or optimizer cut short returns a different one
+SEARCH_KEYS = ('assignment', 'randomize_order', 'restart_factor', 'max_iterations', 'time_limit')
+OPTIMIZER_KEYS = ('max_moves', 'time_limit', 'seeded_time_cap', 'start_temperature', 'end_temperature',
+                  'tabu_tenure', 'weights')
+
+FORMAT_VERSION = 3  # Bump when the entry layout or solver output changes meaning
+
+logger = get_logger("cache")
+
+
+def describe_inputs(school, break_slots, seed, **options):
+    """Canonical, JSON-ready description of a solve's inputs"""
+    subjects = {}
+    for class_obj in school.classes:
+        for subject in class_obj.subjects:
+            subjects[subject.get_name()] = subject
+    for faculty in school.faculties:
+        for subject in faculty.get_subjects():
+            subjects[subject.get_name()] = subject
+    return {
+        "version": FORMAT_VERSION,
+        "subjects": sorted(
+            [name, subject.get_credits(), subject.get_labslots() if isinstance(subject, Labs) else None]
+            for name, subject in subjects.items()),
+        "faculties": sorted(
+            [faculty.get_name(), sorted(s.get_name() for s in faculty.get_subjects()),
+             sorted([day, mask] for day, mask in faculty.blocked.items() if mask)]
+            for faculty in school.faculties),
+        # Class order is kept: the sequential solver works through it in order
+        "classes": [[c.get_name(), [s.get_name() for s in c.subjects]] for c in school.classes],
+        "breaks": sorted(period for period, _ in break_slots.values()),
+        "workdays": list(WORKDAYS),
+        "hours_per_day": HOURS_PER_DAY,
+        "max_hours_per_day": MAX_HOURS_PER_DAY,
+        "min_freshness": MIN_FRESHNESS_SCORE,
+        "lab_constraints": sorted(LAB_CONSTRAINTS.items()),
+        "search": sorted([key, BACKTRACK_SETTINGS[key]] for key in SEARCH_KEYS),
+        # The optimizer's settings only matter when it runs
+        "optimizer": (sorted([key, OPTIMIZER_SETTINGS[key]] for key in OPTIMIZER_KEYS)
+                      if options.get("optimize") else None),
+        "options": sorted(options.items()),
+        "seed": seed,
+    }
+
+
+def input_digest(inputs):
+    text = json.dumps(inputs, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def input_features(inputs):
+    """Flatten a description into a set of strings for similarity"""
+    features = {f"subject:{name}:{credits}:{slots}" for name, credits, slots in inputs["subjects"]}
+    features |= {f"faculty:{name}:{subject}" for name, subjects, _ in inputs["faculties"] for subject in subjects}
+    features |= {f"blocked:{name}:{day}:{mask}" for name, _, blocked in inputs["faculties"] for day, mask in blocked}
+    features |= {f"class:{name}:{subject}" for name, subjects in inputs["classes"] for subject in subjects}
+    features |= {f"break:{period}" for period in inputs["breaks"]}
+    features |= {f"{key}:{inputs[key]}" for key in
+                 ("workdays", "hours_per_day", "max_hours_per_day", "min_freshness", "seed")}
+    features |= {f"lab:{key}:{value}" for key, value in inputs["lab_constraints"]}
+    features |= {f"search:{key}:{value}" for key, value in inputs["search"]}
+    features |= {f"optimizer:{key}:{json.dumps(value, sort_keys=True)}" for key, value in inputs["optimizer"] or ()}
+    features |= {f"option:{key}:{value}" for key, value in inputs["options"]}
+    return features
+
+
+class SolutionCache:
+    """Directory of solved timetables with an LRU index"""
+
+    def __init__(self, directory=None, max_entries=None, max_bytes=None):
+        self.directory = directory or CACHE_SETTINGS['directory']
+        self.max_entries = max_entries or CACHE_SETTINGS['max_entries']
+        self.max_bytes = max_bytes or CACHE_SETTINGS['max_bytes']
+        self.index_path = os.path.join(self.directory, "index.json")
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _load_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_json(self, path, data):
+        # Write then rename, so a crash never leaves a half-written file
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(temporary, path)
+
+    def get(self, digest):
+        """Stored result for an exact key, or None; marks it recently used"""
+        index = self._load_index()
+        if digest not in index:
+            return None
+        try:
+            with open(self._path(digest)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        index[digest]["used"] = max(meta["used"] for meta in index.values()) + 1
+        self._write_json(self.index_path, index)
+        return entry["result"]
+
+    def nearest(self, inputs, min_similarity=None):
+        """
+        (similarity, stored result) of the most similar entry with the same
+        seed, or None below the threshold
+        """
+        if min_similarity is None:
+            min_similarity = CACHE_SETTINGS['warm_start_similarity']
+        features = input_features(inputs)
+        seed = f"seed:{inputs['seed']}"
+        best = None
+        for digest, meta in self._load_index().items():
+            other = set(meta["features"])
+            if seed not in other:
+                # Another seed asks for a different timetable, not a nearby one
+                continue
+            similarity = len(features & other) / len(features | other) if features | other else 0.0
+            if similarity >= min_similarity and (best is None or similarity > best[0]):
+                best = (similarity, digest)
+        if best is None:
+            return None
+        try:
+            with open(self._path(best[1])) as f:
+                return best[0], json.load(f)["result"]
+        except (OSError, ValueError):
+            return None
+
+    def put(self, digest, inputs, result):
+        """Store a result and evict least recently used entries over the caps"""
+        path = self._path(digest)
+        self._write_json(path, {"inputs": inputs, "result": result})
+        index = self._load_index()
+        index[digest] = {
+            "features": sorted(input_features(inputs)),
+            "bytes": os.path.getsize(path),
+            "used": max((meta["used"] for meta in index.values()), default=0) + 1,
+        }
+        by_age = sorted(index, key=lambda d: index[d]["used"])
+        while by_age and (len(index) > self.max_entries
+                          or sum(meta["bytes"] for meta in index.values()) > self.max_bytes):
+            oldest = by_age.pop(0)
+            del index[oldest]
+            try:
+                os.remove(self._path(oldest))
+            except OSError:
+                pass
+        self._write_json(self.index_path, index)
+
+
+def warm_start(school, data, break_slots, rng=None, metrics=None):
+    """
+    Lay out the school from a cached result for similar inputs: keep the
+    cached teachers and lessons that are still valid, then let the repair
+    search place whatever is missing, counting its nodes in `metrics`.
+    Returns True on a complete timetable.
+    """
+    faculty_by_name = {faculty.get_name(): faculty for faculty in school.faculties}
+
+    # Teachers: cached ones where still qualified, else the least-loaded qualified one
+    school.clear_assignments()
+    load = {faculty: 0 for faculty in school.faculties}
+    for class_obj in school.classes:
+        cached = data["assignments"].get(class_obj.get_name(), {})
+        for subject in class_obj.subjects:
+            assigned = set(class_obj.faculties.values())
+            faculty = faculty_by_name.get(cached.get(subject.get_name()))
+            if faculty is None or not school.can_teach(faculty, subject) or faculty in assigned:
+                candidates = [f for f in school.qualified_faculty(subject) if f not in assigned]
+                if not candidates:
+                    return False
+                faculty = min(candidates, key=lambda f: load[f])
+            school.assign(class_obj, subject, faculty)
+            load[faculty] += required_hours(subject)
+
+    # Empty timetables with the current break layout
+    breaks = {period - 1 for period, _ in break_slots.values()}
+    for class_obj in school.classes:
+        class_obj.timetable = {
+            day: ["BREAK" if hour in breaks else None for hour in range(HOURS_PER_DAY)]
+            for day in WORKDAYS
+        }
+    school.rebuild_occupancy()
+
+    def available(faculty, day, hour):
+        return (not faculty.is_occupied(day, hour)
+                and faculty.hours_on(day) < MAX_HOURS_PER_DAY
+                and faculty.isfree_score[day][hour] >= MIN_FRESHNESS_SCORE)
+
+    # Lessons: copy cached ones that still respect every constraint
+    incomplete = []
+    for class_obj in school.classes:
+        grid = class_obj.grid
+        subject_by_name = {subject.get_name(): subject for subject in class_obj.subjects}
+        placed = {subject: 0 for subject in class_obj.subjects}
+        labs_on_day = {day: 0 for day in WORKDAYS}
+        for day, slots in data["timetables"].get(class_obj.get_name(), {}).items():
+            if day not in labs_on_day:
+                continue
+            start = grid.offset(class_obj.row, day, 0)
+            hour = 0
+            while hour < min(len(slots), HOURS_PER_DAY):
+                slot = slots[hour]
+                subject = subject_by_name.get(slot[0]) if isinstance(slot, list) else None
+                block = subject.get_labslots() if isinstance(subject, Labs) else 1
+                hours = range(hour, hour + block)
+                if (subject is None
+                        or class_obj.faculties[subject].get_name() != slot[1]
+                        or placed[subject] + block > required_hours(subject)
+                        or hour + block > min(len(slots), HOURS_PER_DAY)
+                        or any(slots[h] != slot or grid.cells[start + h] != FREE_CODE for h in hours)
+                        or (block > 1 and labs_on_day[day] >= LAB_CONSTRAINTS['max_labs_per_day'])):
+                    hour += 1
+                    continue
+                faculty = class_obj.faculties[subject]
+                if all(available(faculty, day, h) for h in hours):
+                    for h in hours:
+                        grid.cells[start + h] = grid.code(subject, faculty)
+                        faculty.occupy(day, h)
+                    placed[subject] += block
+                    labs_on_day[day] += 1 if block > 1 else 0
+                hour += block
+        if any(placed[s] < required_hours(s) for s in class_obj.subjects):
+            incomplete.append(class_obj)
+
+    kept = sum(1 for class_obj in school.classes for slots in class_obj.timetable.values()
+               for slot in slots if slot is not None and slot != "BREAK")
+    event(logger, "warm_start_kept",
+          f"Warm start kept {kept} cached lessons; {len(incomplete)} classes need more",
+          kept=kept, incomplete=len(incomplete))
+    if not incomplete:
+        return True
+    success, _ = repair(school, set(), classes=incomplete, rng=rng, metrics=metrics)
+    return success
@@ -0,0 +1,204 @@
+"""
+Command-line entry point for batch and headless runs.
+
+    python cli.py solve [school.json ...] [--output DIR]
+    python cli.py export [school.json] [--output DIR] [--formats csv,json,ics] [--archive]
+    python cli.py analyze [school.json]
+    python cli.py benchmark [--quick | --scales demo,small,medium] [--compare baseline.json] ...
+    python cli.py gui [school.json]
+
+A school config is a JSON file:
+
+    {
+      "subjects": [
+        {"name": "Mathematics", "credits": 4},
+        {"name": "Physics Lab", "credits": 2, "lab_slots": 2}
+      ],
+      "faculties": [{"name": "Dr. Math1", "subjects": ["Mathematics"]}],
+      "classes": [{"name": "11-A Sci", "subjects": ["Mathematics", "Physics Lab"]}]
+    }
+
+Without a config file the demo roster is used. Only the gui command
+imports tkinter. --log-level, --log-format json and --log-file go before
+the command, e.g. `python cli.py --log-format json solve school.json`.
+"""
+import argparse
+import json
+import os
+import sys
+
+from models import Class, Faculty, Labs, School, Subject
+from exporter import FORMATS
+from logs import configure
+import main
+
+
+def school_from_config(data):
+    """Build a School from a parsed config; unknown subject names raise ValueError"""
+    subjects = {}
+    for entry in data["subjects"]:
+        if "lab_slots" in entry:
+            subjects[entry["name"]] = Labs(entry["name"], entry["credits"], entry["lab_slots"])
+        else:
+            subjects[entry["name"]] = Subject(entry["name"], entry["credits"])
+
+    def lookup(names, owner):
+        missing = [name for name in names if name not in subjects]
+        if missing:
+            raise ValueError(f"{owner}: unknown subjects {', '.join(missing)}")
+        return [subjects[name] for name in names]
+
+    faculties = [Faculty(entry["name"], lookup(entry["subjects"], entry["name"]))
+                 for entry in data["faculties"]]
+    classes = [Class(entry["name"], lookup(entry["subjects"], entry["name"]))
+               for entry in data["classes"]]
+    return School(classes, faculties)
+
+
+def load_school(path=None):
+    """School from a JSON config file, or the demo roster without one"""
+    if path is None:
+        return main.demo_school()
+    with open(path) as f:
+        return school_from_config(json.load(f))
+
+
+def export_formats(text):
+    """--formats value as a list, checked before any solving starts"""
+    formats = text.split(",")
+    unknown = [name for name in formats if name not in FORMATS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown formats {', '.join(unknown)} (choose from {', '.join(FORMATS)})")
+    return formats
+
+
+def solve(path, args):
+    """
+    Load and solve one school; returns (school, success). A config that
+    cannot be read or does not describe a school is reported and gives
+    (None, False).
+    """
+    try:
+        school = load_school(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"{path}: cannot load config ({e})")
+        return None, False
+    success = main.schedule_backtrack(
+        school, engine=args.engine, mode=args.mode, attempts=args.attempts, seed=args.seed,
+        optimize=False if args.no_optimize else None,
+        use_cache=False if args.no_cache else None)
+    print(f"{path or 'demo'}: {'solved' if success else 'FAILED'}")
+    if args.metrics:
+        # One JSON line per solve, so repeated runs and batches append
+        with open(args.metrics, "a") as f:
+            f.write(json.dumps(dict(config=path or "demo", **success.to_dict())) + "\n")
+    return school, success
+
+
+def cmd_solve(args):
+    failed = 0
+    for path in args.configs or [None]:
+        school, success = solve(path, args)
+        if not success:
+            failed += 1
+        elif args.output:
+            os.makedirs(args.output, exist_ok=True)
+            name = os.path.splitext(os.path.basename(path))[0] if path else "demo"
+            with open(os.path.join(args.output, f"{name}.json"), "w") as f:
+                json.dump(main.serialize_timetables(school), f, indent=2)
+    return 1 if failed else 0
+
+
+def cmd_export(args):
+    school, success = solve(args.config, args)
+    if not success:
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+    try:
+        written = main.export_timetables(school, args.output, args.formats, True if args.archive else None)
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"Wrote {len(written)} files")
+    return 0
+
+
+def cmd_analyze(args):
+    school, success = solve(args.config, args)
+    if not success:
+        return 1
+    main.analyze_free_periods(school)
+    return 0
+
+
+def cmd_gui(args):
+    school, success = solve(args.config, args)
+    if not success:
+        return 1
+    main.create_gui(school)
+    return 0
+
+
+def cmd_benchmark(args):
+    import benchmark
+    return benchmark.run(args.options)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Generate school timetables")
+    parser.add_argument("--log-level", help="TRACE, DEBUG, INFO, WARNING or ERROR (default: LOG_SETTINGS)")
+    parser.add_argument("--log-format", choices=["text", "json"], help="json writes one record per line")
+    parser.add_argument("--log-file", help="write logs here instead of standard output")
+    parser.add_argument("--quiet", action="store_true", help="only log warnings and errors")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    solver = argparse.ArgumentParser(add_help=False)
+    solver.add_argument("--engine", choices=["backtrack", "csp"], help="per-class solver")
+    solver.add_argument("--mode", choices=["sequential", "simultaneous"])
+    solver.add_argument("--attempts", type=int, help="seeded solves to run in parallel")
+    solver.add_argument("--seed", type=int, help="seed for a reproducible solve")
+    solver.add_argument("--no-optimize", action="store_true", help="skip the local-search stage")
+    solver.add_argument("--no-cache", action="store_true", help="neither read nor fill the solution cache")
+    solver.add_argument("--metrics", help="append solver metrics for each solve to this JSON-lines file")
+
+    solve_cmd = commands.add_parser("solve", parents=[solver], help="solve one or more schools")
+    solve_cmd.add_argument("configs", nargs="*", help="school config files (default: demo roster)")
+    solve_cmd.add_argument("--output", help="directory for <config>.json results")
+    solve_cmd.set_defaults(run=cmd_solve)
+
+    export_cmd = commands.add_parser("export", parents=[solver], help="solve and write timetable files")
+    export_cmd.add_argument("config", nargs="?")
+    export_cmd.add_argument("--output", default=".", help="directory for the timetable files")
+    export_cmd.add_argument("--formats", type=export_formats, help="comma-separated, from csv, json and ics (default: EXPORT_SETTINGS)")
+    export_cmd.add_argument("--archive", action="store_true", help="write one timetables.zip instead")
+    export_cmd.set_defaults(run=cmd_export)
+
+    analyze_cmd = commands.add_parser("analyze", parents=[solver], help="solve and report free periods")
+    analyze_cmd.add_argument("config", nargs="?")
+    analyze_cmd.set_defaults(run=cmd_analyze)
+
+    gui_cmd = commands.add_parser("gui", parents=[solver], help="solve and show the timetables")
+    gui_cmd.add_argument("config", nargs="?")
+    gui_cmd.set_defaults(run=cmd_gui)
+
+    # Its options are benchmark.py's own and are passed through unparsed
+    bench_cmd = commands.add_parser("benchmark", add_help=False,
+                                    help="benchmark the solvers on synthetic schools")
+    bench_cmd.set_defaults(run=cmd_benchmark)
+    return parser
+
+
+def run(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "benchmark":
+        args.options = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    configure("WARNING" if args.quiet else args.log_level, args.log_format, args.log_file)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(run())
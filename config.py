@@ -46,6 +46,33 @@ LAB_CONSTRAINTS = {
     'consecutive_slots': 2     # Lab sessions require consecutive slots
 }
 
+# Short subject and day names for timetable grids and exports;
+# subjects not listed use the first three letters of their name
+SUBJECT_ABBREVIATIONS = {
+    "Mathematics": "MAT",
+    "Physics": "PHY",
+    "Chemistry": "CHM",
+    "Biology": "BIO",
+    "English": "ENG",
+    "Computer": "COM",
+    "History": "HIS",
+    "Geography": "GEO",
+    "Physics Lab": "PLB",
+    "Chemistry Lab": "CLB",
+    "Biology Lab": "BLB",
+    "Computer Lab": "CPL"  # Using CPL to avoid confusion with Chemistry Lab
+}
+
+DAY_ABBREVIATIONS = {
+    "Monday": "MON",
+    "Tuesday": "TUE",
+    "Wednesday": "WED",
+    "Thursday": "THU",
+    "Friday": "FRI",
+    "Saturday": "SAT",
+    "Sunday": "SUN"
+}
+
 # GUI settings
 GUI_SETTINGS = {
     'window_width': 1000,
@@ -59,6 +86,58 @@ GUI_SETTINGS = {
 
 # Backtracking settings
 BACKTRACK_SETTINGS = {
-    'max_iterations': 10000000, # Maximum number of iterations before giving up
-    'randomize_order': True   # Randomize subject/faculty order during assignment
-}
\ No newline at end of file
+    'max_iterations': 10000000, # Maximum search nodes per solve before giving up
+    'time_limit': 60,           # Wall-clock seconds per solve (None for no limit)
+    'randomize_order': True,  # Randomize subject/faculty order during assignment
+    'seed': None,             # Seed for reproducible solves (None = different every run)
+    'assignment': 'matching', # Teacher assignment: 'matching' (balanced by load) or 'backtrack'
+    'engine': 'backtrack',    # Per-class solver: 'backtrack' or 'csp' (constraint propagation)
+    'mode': 'sequential',     # 'sequential' (class by class) or 'simultaneous' (whole school at once; not always faster)
+    'parallel_attempts': 1,   # Independently seeded solves to run in parallel (1 = single solve)
+    'parallel_workers': None, # Worker processes for parallel solves (None = CPU count)
+    'stop_at_first_success': True, # Stop parallel solves at the first success, else keep the best
+    'parallel_start_method': None, # Worker start: 'fork', 'spawn' or 'forkserver' (None = platform default)
+    'repair_max_nodes': 20000, # Search nodes per widening step of a timetable repair
+    'restart_factor': 4        # CSP engine restarts after this many nodes per open period, doubling each time (None = never)
+}
+
+# Local-search improvement after a successful solve (see optimizer.py)
+OPTIMIZER_SETTINGS = {
+    'enabled': True,            # Improve solved timetables before returning them
+    'time_limit': 5,            # Wall-clock seconds before an unseeded run stops early
+    'seeded_time_cap': 60,      # Seeded runs stop on max_moves alone; this only cuts a runaway one short, with a warning
+    'max_moves': 100000,        # Moves tried; the temperature schedule spans these
+    'start_temperature': 2.0,   # Annealing temperature at the start (cost units)
+    'end_temperature': 0.05,    # Temperature reached when the budget is used up
+    'tabu_tenure': 50,          # Moves a changed period stays locked
+    'weights': {
+        'gap': 3,               # Free period between two lessons of a day
+        'same_day': 2,          # Extra lesson of a subject on the same day
+        'same_hour': 1,         # Extra lesson of a subject at the same hour across the week
+        'shortfall': 10         # Credit hour a subject is still missing
+    }
+}
+
+# On-disk cache of solved timetables (see cache.py)
+CACHE_SETTINGS = {
+    'enabled': True,                # Reuse stored solutions for identical inputs (seeded solves only)
+    'directory': ".timetable_cache", # Where entries are kept
+    'max_entries': 100,             # Least recently used entries are evicted beyond this
+    'max_bytes': 50 * 1024 * 1024,  # ... or beyond this total size
+    'warm_start_similarity': 0.8    # Minimum input similarity (0-1) to warm-start from an entry
+}
+
+# Logging (see logs.py)
+LOG_SETTINGS = {
+    'level': 'INFO',   # TRACE shows every search step; WARNING keeps only problems
+    'format': 'text',  # 'text' (messages only) or 'json' (one record per line)
+    'file': None       # Log file path (None = standard output)
+}
+
+# Timetable export (see exporter.py)
+EXPORT_SETTINGS = {
+    'formats': ['csv', 'json', 'ics'],  # Any of 'csv', 'json' and 'ics'
+    'archive': False,     # Write one timetables.zip instead of separate files
+    'term_start': None,   # First week of the calendars as 'YYYY-MM-DD' (None = next Monday)
+    'term_weeks': 16      # Weeks the calendar lessons repeat
+}
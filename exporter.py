@@ -0,0 +1,313 @@
+"""
+Export of solved timetables in machine-readable formats.
+
+export_school() walks the school grid once, class by class, and feeds
+every period of the class side to the writers of the requested formats:
+
+    csv   timetable.csv, one row per class and period
+    json  timetable.json, every class and faculty timetable in one document
+    ics   calendars/class_<name>.ics and calendars/faculty_<name>.ics, each
+          lesson a weekly event at its real time from TIME_SLOTS
+
+Faculty outputs are read from each faculty's indexed timetable
+(School.index_faculty_timetables, a second pass over the grid) and
+Faculty.load_summary(), the same view the GUI shows. Calendar file names
+and event UIDs come from file_names(), which keeps them unique when two
+names have the same file-name form. Each file is built in memory and
+written with a single write, either into a directory or into one zip
+archive.
+"""
+import collections
+import csv
+import datetime
+import io
+import json
+import os
+import re
+import zipfile
+from models import Labs, FREE_CODE, BREAK_CODE
+from logs import event, get_logger
+from config import WORKDAYS, HOURS_PER_DAY, EXPORT_SETTINGS
+
+FORMATS = ('csv', 'json', 'ics')
+ARCHIVE_NAME = "timetables.zip"
+
+logger = get_logger("exporter")
+
+
+def period_times(time_slots):
+    """Per period (start, end, break name or None), from "HH:MM-HH:MM (Name)" slots"""
+    periods = []
+    for period in range(1, HOURS_PER_DAY + 1):
+        text = time_slots.get(period, "")
+        times, _, name = text.partition(" (")
+        start, _, end = times.partition("-")
+        periods.append((start.strip() or None, end.strip() or None, name.rstrip(")") or None))
+    return periods
+
+
+def safe_name(name):
+    """File-name form of a class or faculty name"""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name).strip("_") or "unnamed"
+
+
+def file_names(objects):
+    """
+    Unique file-name form of each class or faculty name: names with the same
+    safe_name (e.g. "11-A Sci" and "11-A/Sci") get "~" and the object's ID,
+    a character safe_name never leaves in
+    """
+    forms = {obj: safe_name(obj.get_name()) for obj in objects}
+    counts = collections.Counter(forms.values())
+    return {obj: f"{form}~{obj.id}" if counts[form] > 1 else form for obj, form in forms.items()}
+
+
+def term_start(value=None):
+    """Monday of the first calendar week: `value` ('YYYY-MM-DD') or the next Monday"""
+    value = value or EXPORT_SETTINGS['term_start']
+    day = datetime.date.fromisoformat(value) if value else datetime.date.today()
+    return day + datetime.timedelta(days=(7 - day.weekday()) % 7)
+
+
+def ics_text(value):
+    """Escape a value for an iCalendar TEXT property"""
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def ics_fold(line):
+    """Split a content line into 75-octet pieces, as iCalendar requires"""
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line
+    pieces = []
+    while data:
+        size = min(len(data), 75 if not pieces else 74)
+        # Do not cut a UTF-8 sequence in half
+        while size < len(data) and data[size] & 0xC0 == 0x80:
+            size -= 1
+        pieces.append(data[:size].decode("utf-8"))
+        data = data[size:]
+    return "\r\n ".join(pieces)
+
+
+class Calendar:
+    """Lines of one .ics file with weekly repeating lessons"""
+
+    def __init__(self, name, first_monday, weeks, stamp):
+        self.first_monday = first_monday
+        self.weeks = weeks
+        self.stamp = stamp
+        self.lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Timetable Generator//EN",
+                      "CALSCALE:GREGORIAN", f"X-WR-CALNAME:{ics_text(name)}"]
+
+    def add(self, uid, day, start, end, summary, description):
+        # Floating local times: the lesson is at the same clock time wherever the calendar is read
+        date = self.first_monday + datetime.timedelta(days=WORKDAYS.index(day))
+        on = date.strftime("%Y%m%d")
+        self.lines += [
+            "BEGIN:VEVENT",
+            f"UID:{uid}",
+            f"DTSTAMP:{self.stamp}",
+            f"DTSTART:{on}T{start.replace(':', '').zfill(4)}00",
+            f"DTEND:{on}T{end.replace(':', '').zfill(4)}00",
+            f"RRULE:FREQ=WEEKLY;COUNT={self.weeks}",
+            ics_fold(f"SUMMARY:{ics_text(summary)}"),
+            ics_fold(f"DESCRIPTION:{ics_text(description)}"),
+            "END:VEVENT",
+        ]
+
+    def text(self):
+        return "\r\n".join(self.lines + ["END:VCALENDAR"]) + "\r\n"
+
+
+def faculty_calendar(faculty, names, periods, first_monday, weeks, stamp):
+    """
+    Calendar of one faculty's indexed timetable; a lab's consecutive periods
+    are one event. names maps the faculty and its classes to file_names().
+    """
+    calendar = Calendar(faculty.get_name(), first_monday, weeks, stamp)
+    for day in WORKDAYS:
+        lessons = faculty.timetable.get(day) or [None] * HOURS_PER_DAY
+        hour = 0
+        while hour < HOURS_PER_DAY:
+            lesson = lessons[hour]
+            if not lesson:
+                hour += 1
+                continue
+            class_obj, subject = lesson
+            block = 1
+            if isinstance(subject, Labs):
+                while hour + block < HOURS_PER_DAY and lessons[hour + block] == lesson:
+                    block += 1
+            begin, span_end = periods[hour][0], periods[hour + block - 1][1]
+            if begin and span_end:
+                name = class_obj.get_name()
+                calendar.add(f"{names[faculty]}-{names[class_obj]}-{day}-{hour + 1}"
+                             "@timetable-generator", day, begin, span_end,
+                             f"{subject.get_name()} - {name}",
+                             f"{faculty.get_name()}, period {hour + 1}"
+                             + (f"-{hour + block}" if block > 1 else ""))
+            hour += block
+    return calendar
+
+
+class Output:
+    """Files of one export: a directory, or members of a zip archive"""
+
+    def __init__(self, directory, archive=None):
+        self.directory = directory
+        self.archive = zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) if archive else None
+        self.written = []
+
+    def write(self, name, text):
+        if self.archive is not None:
+            self.archive.writestr(name, text)
+            self.written.append(f"{self.archive.filename}:{name}")
+            return
+        path = os.path.join(self.directory, name)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # newline="" keeps the CRLF line ends csv and iCalendar need
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        self.written.append(path)
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+
+
+def export_school(school, time_slots, directory=".", formats=None, archive=None,
+                  first_monday=None, weeks=None):
+    """
+    Write the school's class and faculty timetables in `formats` (default
+    EXPORT_SETTINGS['formats']): one pass over the grid for the classes,
+    then the faculty side from the faculty index. archive=True writes
+    everything into directory/timetables.zip, a path names the zip (default
+    EXPORT_SETTINGS['archive']). first_monday and weeks set the calendars'
+    first week and length. Returns the files written.
+    """
+    formats = list(formats or EXPORT_SETTINGS['formats'])
+    unknown = [name for name in formats if name not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown export formats: {', '.join(unknown)} (choose from {', '.join(FORMATS)})")
+    if archive is None:
+        archive = EXPORT_SETTINGS['archive']
+    if archive is True:
+        archive = os.path.join(directory, ARCHIVE_NAME)
+    if archive:
+        os.makedirs(os.path.dirname(archive) or ".", exist_ok=True)
+    first_monday = first_monday or term_start()
+    weeks = weeks or EXPORT_SETTINGS['term_weeks']
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    periods = period_times(time_slots)
+
+    rows = None
+    if 'csv' in formats:
+        rows = io.StringIO()
+        table = csv.writer(rows)
+        table.writerow(["class", "day", "period", "start", "end", "kind", "subject", "abbreviation", "faculty"])
+    document = None
+    if 'json' in formats:
+        document = {
+            "generated": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "days": list(WORKDAYS),
+            "periods": [{"period": p + 1, "start": start, "end": end, "break": name}
+                        for p, (start, end, name) in enumerate(periods)],
+            "abbreviations": {},
+            "classes": {},
+            "faculty": {},
+        }
+    calendars = 'ics' in formats
+
+    # Faculty side: one index pass, then read per faculty after the classes
+    school.index_faculty_timetables()
+    faculties = dict.fromkeys(school.faculties)
+    names = file_names(school.classes)
+    output = Output(directory, archive)
+    try:
+        grid = school.grid
+        for class_obj in school.classes:
+            name = class_obj.get_name()
+            laid_out = grid.laid_out[class_obj.row]
+            days = {}
+            calendar = Calendar(name, first_monday, weeks, stamp) if calendars else None
+            for day in WORKDAYS:
+                start = grid.offset(class_obj.row, day, 0)
+                slots = []
+                hour = 0
+                while hour < HOURS_PER_DAY:
+                    code = grid.cells[start + hour] if day in laid_out else FREE_CODE
+                    begin, end, break_name = periods[hour]
+                    if code < 0:
+                        kind = "break" if code == BREAK_CODE else "free"
+                        slots.append("BREAK" if code == BREAK_CODE else None)
+                        if rows is not None:
+                            table.writerow([name, day, hour + 1, begin, end, kind,
+                                            (break_name or "") if kind == "break" else "", "", ""])
+                        hour += 1
+                        continue
+
+                    subject, faculty = grid.pairs[code]
+                    # A lab's consecutive periods are one calendar event
+                    block = 1
+                    if isinstance(subject, Labs):
+                        while hour + block < HOURS_PER_DAY and grid.cells[start + hour + block] == code:
+                            block += 1
+                    for h in range(hour, hour + block):
+                        slots.append([subject.get_name(), faculty.get_name()])
+                        if rows is not None:
+                            table.writerow([name, day, h + 1, periods[h][0], periods[h][1],
+                                            "lab" if isinstance(subject, Labs) else "lesson",
+                                            subject.get_name(), subject.get_abbreviation(), faculty.get_name()])
+                    # Teaching here but no longer on the roster
+                    faculties.setdefault(faculty)
+                    if document is not None:
+                        document["abbreviations"][subject.get_name()] = subject.get_abbreviation()
+                    if calendar is not None and begin and periods[hour + block - 1][1]:
+                        span_end = periods[hour + block - 1][1]
+                        uid = f"{names[class_obj]}-{day}-{hour + 1}@timetable-generator"
+                        calendar.add(uid, day, begin, span_end, f"{subject.get_name()} - {faculty.get_name()}",
+                                     f"{name}, period {hour + 1}" + (f"-{hour + block}" if block > 1 else ""))
+                    hour += block
+                days[day] = slots
+
+            if document is not None:
+                document["classes"][name] = {
+                    "assignments": {subject.get_name(): faculty.get_name()
+                                    for subject, faculty in class_obj.faculties.items()},
+                    "timetable": days,
+                }
+            if calendar is not None:
+                # A class calendar is complete once its row is done
+                output.write(f"calendars/class_{names[class_obj]}.ics", calendar.text())
+
+        # Faculty met only in the class pass are known now
+        names.update(file_names(faculties))
+        for faculty in faculties:
+            if document is not None:
+                summary = faculty.load_summary()
+                document["faculty"][faculty.get_name()] = {
+                    "subjects": [subject.get_name() for subject in faculty.get_subjects()],
+                    "timetable": {day: [[lesson[0].get_name(), lesson[1].get_name()] if lesson else None
+                                        for lesson in faculty.timetable.get(day) or [None] * HOURS_PER_DAY]
+                                  for day in WORKDAYS},
+                    "hours_per_day": summary['hours_per_day'],
+                    "total_hours": summary['total_hours'],
+                    "lowest_freshness": {day: min(summary['freshness'][day]) for day in WORKDAYS},
+                }
+            if calendars:
+                calendar = faculty_calendar(faculty, names, periods, first_monday, weeks, stamp)
+                output.write(f"calendars/faculty_{names[faculty]}.ics", calendar.text())
+
+        if rows is not None:
+            output.write("timetable.csv", rows.getvalue())
+        if document is not None:
+            output.write("timetable.json", json.dumps(document, indent=2))
+    finally:
+        output.close()
+
+    event(logger, "exported",
+          f"Exported {len(school.classes)} classes and {len(faculties)} faculty "
+          f"as {', '.join(formats)} to {archive or directory}",
+          formats=formats, files=len(output.written), target=archive or directory)
+    return output.written
@@ -0,0 +1,199 @@
+"""
+Pre-solve feasibility analysis.
+
+Runs before teacher assignment and rejects configurations that no search
+can satisfy: more credit hours than faculty capacity, more lessons than
+periods, labs that do not fit the day layout, or classes that cannot get a
+different qualified teacher for every subject. This is the capacity
+arithmetic of analyze_free_periods in main.py, done up front.
+"""
+from collections import deque
+from models import Labs
+from scheduler import required_hours
+from config import (
+    HOURS_PER_DAY,
+    WORKDAYS,
+    MAX_HOURS_PER_DAY,
+    LAB_CONSTRAINTS
+)
+
+
+class FeasibilityReport:
+    def __init__(self):
+        self.errors = []    # Problems that make a timetable impossible
+        self.warnings = []  # Inputs the solver will silently adjust
+
+    def is_feasible(self):
+        return not self.errors
+
+    def __str__(self):
+        lines = ["Feasibility check: " + ("OK" if self.is_feasible() else "INFEASIBLE")]
+        lines += [f"  ERROR: {message}" for message in self.errors]
+        lines += [f"  WARNING: {message}" for message in self.warnings]
+        return "\n".join(lines)
+
+
+def teaching_periods(break_slots):
+    """0-indexed periods of a day that are not breaks"""
+    breaks = {period - 1 for period, _ in break_slots.values()}
+    return [hour for hour in range(HOURS_PER_DAY) if hour not in breaks]
+
+
+def lab_windows_per_day(periods, block):
+    """How many non-overlapping runs of `block` consecutive teaching periods fit in a day"""
+    windows = 0
+    run = 0
+    previous = None
+    for hour in periods:
+        run = run + 1 if previous is not None and hour == previous + 1 else 1
+        previous = hour
+        if run == block:
+            windows += 1
+            run = 0
+            previous = None
+    return windows
+
+
+def max_flow(capacity, source, sink):
+    """Edmonds-Karp on a dict-of-dicts capacity graph; returns (flow value, flow dict)"""
+    # Add zero-capacity reverse edges so residual flow can be pushed back
+    flow = {}
+    for u, edges in list(capacity.items()):
+        for v in list(edges):
+            flow.setdefault(u, {})[v] = 0
+            flow.setdefault(v, {}).setdefault(u, 0)
+            capacity.setdefault(v, {}).setdefault(u, 0)
+    flow.setdefault(sink, {})
+    capacity.setdefault(sink, {})
+
+    total = 0
+    while True:
+        parent = {source: None}
+        queue = deque([source])
+        while queue and sink not in parent:
+            u = queue.popleft()
+            for v, cap in capacity[u].items():
+                if v not in parent and cap - flow[u][v] > 0:
+                    parent[v] = u
+                    queue.append(v)
+        if sink not in parent:
+            return total, flow
+
+        # Bottleneck along the path, then augment
+        bottleneck = None
+        v = sink
+        while parent[v] is not None:
+            u = parent[v]
+            residual = capacity[u][v] - flow[u][v]
+            bottleneck = residual if bottleneck is None else min(bottleneck, residual)
+            v = u
+        v = sink
+        while parent[v] is not None:
+            u = parent[v]
+            flow[u][v] += bottleneck
+            flow[v][u] -= bottleneck
+            v = u
+        total += bottleneck
+
+
+def distinct_teachers_possible(class_obj, school):
+    """Check that every subject of a class can get a different qualified faculty (bipartite matching)"""
+    teacher_of = {}  # Faculty -> subject
+
+    def augment(subject, seen):
+        for faculty in school.qualified_faculty(subject):
+            if faculty in seen:
+                continue
+            seen.add(faculty)
+            if faculty not in teacher_of or augment(teacher_of[faculty], seen):
+                teacher_of[faculty] = subject
+                return True
+        return False
+
+    unmatched = []
+    for subject in class_obj.subjects:
+        if not augment(subject, set()):
+            unmatched.append(subject.get_name())
+    return unmatched
+
+
+def check_feasibility(school, break_slots):
+    """Analyze the school configuration before any search; returns a FeasibilityReport"""
+    report = FeasibilityReport()
+    periods = teaching_periods(break_slots)
+    periods_per_week = len(periods) * len(WORKDAYS)
+    faculty_capacity = min(MAX_HOURS_PER_DAY, len(periods)) * len(WORKDAYS)
+
+
+    # Classes: hours against periods, labs against days and windows, distinct teachers
+    demand = {}
+    for class_obj in school.classes:
+        name = class_obj.get_name()
+        class_hours = 0
+        lab_sessions = 0
+        for subject in class_obj.subjects:
+            hours = required_hours(subject)
+            class_hours += hours
+            demand[subject.get_name()] = demand.get(subject.get_name(), 0) + hours
+            if isinstance(subject, Labs):
+                block = subject.get_labslots()
+                lab_sessions += hours // block
+                if hours != subject.get_credits():
+                    report.warnings.append(
+                        f"{name}: {subject.get_name()} has {subject.get_credits()} credits, but only "
+                        f"{hours} hours fit in {LAB_CONSTRAINTS['lab_frequency']} block(s) of {block} slots")
+                if block > len(periods) or lab_windows_per_day(periods, block) == 0:
+                    report.errors.append(
+                        f"{name}: {subject.get_name()} needs {block} consecutive periods, "
+                        f"but no break-free run that long exists in a day")
+
+        if class_hours > periods_per_week:
+            report.errors.append(
+                f"{name}: {class_hours} credit hours but only {periods_per_week} teaching periods per week")
+
+        # Labs per day are capped by the rule and by the consecutive windows a day offers
+        blocks = [s.get_labslots() for s in class_obj.subjects if isinstance(s, Labs)]
+        if blocks:
+            per_day = min(LAB_CONSTRAINTS['max_labs_per_day'], lab_windows_per_day(periods, max(blocks)))
+            if lab_sessions > per_day * len(WORKDAYS):
+                report.errors.append(
+                    f"{name}: {lab_sessions} lab sessions but at most {per_day * len(WORKDAYS)} fit "
+                    f"({per_day} per day)")
+
+        for subject_name in distinct_teachers_possible(class_obj, school):
+            if school.qualified_faculty(subject_name):
+                report.errors.append(
+                    f"{name}: no distinct qualified faculty left for {subject_name} "
+                    f"(each faculty teaches one subject per class)")
+
+    # Subjects: credit hours against the capacity of qualified faculty
+    for subject_name, hours in sorted(demand.items()):
+        teachers = school.qualified_faculty(subject_name)
+        if not teachers:
+            report.errors.append(f"{subject_name}: {hours} hours needed but no faculty is qualified")
+        elif hours > len(teachers) * faculty_capacity:
+            report.errors.append(
+                f"{subject_name}: {hours} hours needed, but {len(teachers)} qualified faculty "
+                f"can teach at most {len(teachers) * faculty_capacity} hours per week")
+
+    # Whole school: faculty teaching several subjects share one weekly capacity
+    capacity = {"source": {}}
+    for subject_name, hours in demand.items():
+        capacity["source"][("subject", subject_name)] = hours
+        capacity[("subject", subject_name)] = {
+            ("faculty", faculty.get_name()): hours for faculty in school.qualified_faculty(subject_name)
+        }
+    for faculty in school.faculties:
+        capacity[("faculty", faculty.get_name())] = {"sink": faculty_capacity}
+    total, flow = max_flow(capacity, "source", "sink")
+    if total < sum(demand.values()):
+        short = {
+            name: hours - flow["source"][("subject", name)]
+            for name, hours in demand.items()
+            if flow["source"][("subject", name)] < hours
+        }
+        details = ", ".join(f"{name} ({hours}h)" for name, hours in sorted(short.items()))
+        report.errors.append(
+            f"Shared faculty capacity is {sum(demand.values()) - total} hours short: {details}")
+
+    return report
@@ -0,0 +1,120 @@
+"""
+Logging for the scheduler.
+
+Every module logs under the "timetable" logger. Progress and results are
+INFO records; per-step search output uses the TRACE level (below DEBUG),
+which is off by default. Trace call sites check isEnabledFor(TRACE) before
+building their message, so a disabled trace costs one level comparison.
+
+Summary records are logged with event(): besides the human-readable
+message they carry an event name and a dict of fields. The console format
+prints only the message; JsonFormatter writes every record as one JSON
+line with the event and fields included, for log pipelines.
+
+forward() copies records into a queue as well, so another thread (the
+GUI) can follow a solve's progress.
+
+Nothing is printed until configure() attaches a handler, apart from
+warnings and errors through logging's last-resort handler.
+"""
+import contextlib
+import json
+import logging
+import logging.handlers
+import sys
+import time
+from config import LOG_SETTINGS
+
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+
+ROOT = "timetable"
+
+
+def get_logger(name):
+    """Logger for one module, under the shared timetable logger"""
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+def event(logger, name, message, level=logging.INFO, **fields):
+    """Log a summary record with a machine-readable event name and fields"""
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"event": name, "fields": fields})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, event, fields"""
+
+    def format(self, record):
+        data = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+                    + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if hasattr(record, "event"):
+            data["event"] = record.event
+            data["fields"] = record.fields
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+def configure(level=None, fmt=None, path=None):
+    """
+    Send timetable logs to stdout, or to `path` if given, replacing any
+    handler set up earlier. level is a name ('TRACE', 'DEBUG', 'INFO', ...)
+    and fmt is 'text' or 'json'; both default to LOG_SETTINGS.
+    """
+    level = level or LOG_SETTINGS['level']
+    fmt = fmt or LOG_SETTINGS['format']
+    path = path or LOG_SETTINGS['file']
+
+    logger = logging.getLogger(ROOT)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    handler = logging.FileHandler(path) if path else logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.getLevelName(level.upper()) if isinstance(level, str) else level)
+    logger.propagate = False
+    return logger
+
+
+@contextlib.contextmanager
+def quiet(level=logging.WARNING):
+    """Temporarily drop timetable records below `level`"""
+    logger = logging.getLogger(ROOT)
+    previous = logger.level
+    logger.setLevel(max(level, logger.getEffectiveLevel()))
+    try:
+        yield
+    finally:
+        logger.setLevel(previous)
+
+
+@contextlib.contextmanager
+def forward(target, level=logging.DEBUG):
+    """
+    Also put timetable records at `level` and above into the queue `target`
+    while the block runs. Handlers already attached keep the level they had.
+    """
+    logger = logging.getLogger(ROOT)
+    previous = logger.level
+    effective = logger.getEffectiveLevel()
+    lowered = [handler for handler in logger.handlers if handler.level == logging.NOTSET]
+    for handler in lowered:
+        handler.setLevel(effective)
+    handler = logging.handlers.QueueHandler(target)
+    handler.setLevel(level)
+    logger.addHandler(handler)
+    logger.setLevel(min(level, effective))
+    try:
+        yield
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(previous)
+        for other in lowered:
+            other.setLevel(logging.NOTSET)
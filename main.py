@@ -1,23 +1,36 @@
-from models import Class, Faculty, School, Subject, Labs, Hour
+from models import Class, Faculty, School, Subject, Labs, Hour, FREE_CODE
+from scheduler import ConstraintSolver, DistributionQueue, SearchBudget, SolveResult, required_hours
+from feasibility import check_feasibility, teaching_periods
+from optimizer import TimetableOptimizer
+from logs import TRACE, configure, event, get_logger, quiet
+from cache import SolutionCache, describe_inputs, input_digest, warm_start
+from collections import deque
+import logging
+import os
 import random
-import tkinter as tk
-from tkinter import ttk
+import time
 from config import (
     HOURS_PER_DAY,
  TIME_SLOTS,
     
     WORKDAYS,
     MAX_HOURS_PER_DAY,
+    MIN_FRESHNESS_SCORE,
     BREAK_SLOTS,
     LAB_CONSTRAINTS,
-    BACKTRACK_SETTINGS
+    BACKTRACK_SETTINGS,
+    OPTIMIZER_SETTINGS,
+    CACHE_SETTINGS
 )
 from datetime import datetime, timedelta
 
-def calculate_time_slots():
+logger = get_logger("main")
+
+def calculate_time_slots(verbose=True):
     """
     Calculate time slots based on school day start/end times and breaks.
     This function automatically distributes the available time evenly among periods.
+    verbose prints the resulting schedule.
     """
     from config import SCHOOL_DAY_START, SCHOOL_DAY_END, BREAKS, HOURS_PER_DAY
     
@@ -40,9 +53,10 @@ def calculate_time_slots():
     # Round to nearest 5 minutes for cleaner schedules
     minutes_per_period = int(5 * round(minutes_per_period / 5))
     
-    print(f"School day: {SCHOOL_DAY_START}-{SCHOOL_DAY_END}, total {total_minutes} minutes")
-    print(f"Teaching periods: {teaching_periods}, each {minutes_per_period} minutes")
-    print(f"Breaks: {len(BREAKS)}, total {total_break_minutes} minutes")
+    if verbose:
+        logger.info(f"School day: {SCHOOL_DAY_START}-{SCHOOL_DAY_END}, total {total_minutes} minutes")
+        logger.info(f"Teaching periods: {teaching_periods}, each {minutes_per_period} minutes")
+        logger.info(f"Breaks: {len(BREAKS)}, total {total_break_minutes} minutes")
     
     # Generate time slots
     time_slots = {}
@@ -64,7 +78,7 @@ def calculate_time_slots():
         position_minutes = (available_teaching_minutes / (len(BREAKS) + 1)) * (i + 1)
         ideal_break_minutes.append(position_minutes)
     
-    print(f"Ideal break positions (minutes into teaching time): {[int(m) for m in ideal_break_minutes]}")
+    logger.debug(f"Ideal break positions (minutes into teaching time): {[int(m) for m in ideal_break_minutes]}")
     
     # Track teaching minutes elapsed so far
     elapsed_teaching_minutes = 0
@@ -112,250 +126,351 @@ def calculate_time_slots():
         time_slots[last_period] = f"{start_time_str}-{end_time.strftime('%H:%M')}"
         
     # Print the calculated time slots for verification
-    print("\nCalculated time slots:")
-    for p, ts in sorted(time_slots.items()):
-        print(f"Period {p}: {ts}")
-    
-    print("\nCalculated break slots:")
-    for name, (period, _) in break_slots.items():
-        print(f"{name}: Period {period}")
+    if verbose:
+        logger.info("\nCalculated time slots:")
+        for p, ts in sorted(time_slots.items()):
+            logger.info(f"Period {p}: {ts}")
+        
+        logger.info("\nCalculated break slots:")
+        for name, (period, _) in break_slots.items():
+            logger.info(f"{name}: Period {period}")
     
     # Override globals with calculated values
-    global TIME_SLOTS, BREAK_SLOTS
+    global TIME_SLOTS, BREAK_SLOTS, _time_slots_ready
     TIME_SLOTS = time_slots
     BREAK_SLOTS = break_slots
+    _time_slots_ready = True
     
     return time_slots, break_slots
 
-# Call this function before scheduling to initialize TIME_SLOTS and BREAK_SLOTS
-TIME_SLOTS, BREAK_SLOTS = calculate_time_slots()
-
-# Define subjects with credits determining weekly hours
-math = Subject("Mathematics", 4)     
-physics = Subject("Physics", 4)
-chemistry = Subject("Chemistry", 4)    
-english = Subject("English", 4)
-biology = Subject("Biology", 4)       
-computer = Subject("Computer", 3)
-history = Subject("History", 3)
-geography = Subject("Geography", 3)
-
-# Lab subjects with specific credit hours
-physics_lab = Labs("Physics Lab", 2, 2)    # 2 credits = 2 consecutive hours once per week
-chemistry_lab = Labs("Chemistry Lab", 2, 2) 
-biology_lab = Labs("Biology Lab", 2, 2)
-computer_lab = Labs("Computer Lab", 2, 2)
-
-# List of subjects grouped by type
-core_subjects = [math, physics, chemistry, english, biology]
-non_core_subjects = [computer, history, geography]
-lab_subjects = [physics_lab, chemistry_lab, biology_lab, computer_lab]
-
-# Combined subject list
-subjects = core_subjects + non_core_subjects + lab_subjects
-
-# --- Define Faculties ---
-faculties = [
-    Faculty("Dr. Math1", [math]),
-    Faculty("Dr. Math2", [math]),
-    Faculty("Dr. Math3", [math]),
-    Faculty("Dr. Phys1", [physics, physics_lab]),
-    Faculty("Dr. Phys2", [physics, physics_lab]),
-    Faculty("Dr. Chem1", [chemistry, chemistry_lab]),
-    Faculty("Dr. Chem2", [chemistry, chemistry_lab]),
-    Faculty("Dr. Chem3", [chemistry, chemistry_lab]),   
-    Faculty("Dr. Bio1", [biology, biology_lab]),
-    Faculty("Dr. Bio2", [biology, biology_lab]),
-    Faculty("Dr. Comp", [computer, computer_lab]),
-    Faculty("Dr. Comp2", [computer, computer_lab]),    # Added another computer teacher
-    Faculty("Dr. Eng1", [english]),
-    Faculty("Dr. Eng2", [english]),
-    Faculty("Dr. Hist", [history, geography]),
-    Faculty("Dr. Hist2", [history, geography])         # Added another history/geography teacher
-]
-
-# --- Define Classes with Lab Distribution ---
-classes = [
-    # Science Stream - Labs on different days
-    Class("11-A Sci", [
-        math, physics, chemistry, english,
-        physics_lab,    # Will be scheduled once per week
-        chemistry_lab   # Will be scheduled on a different day
-    ]),
-    Class("11-B Sci", [
-        math, physics, chemistry, english,
-        physics_lab,    # Once per week
-        chemistry_lab   # Different day from physics lab
-    ]),
-    Class("11-C Bio", [
-        math, biology, chemistry, english,
-        biology_lab,    # Once per week
-        chemistry_lab   # Different day from biology lab
-    ]),
-    # Computer Stream
-    Class("11-D Comp", [
-        math, computer, english, physics,
-        computer_lab,   # Once per week
-        physics_lab     # Different day from computer lab
-    ]),
-    # Humanities Stream
-    Class("11-E Hum", [
-        math, english, history, geography, computer,
-        computer_lab    # Once per week only
-    ])
-]
+# TIME_SLOTS and BREAK_SLOTS hold the config placeholders until calculated
+_time_slots_ready = False
+
+def ensure_time_slots():
+    """Calculate TIME_SLOTS and BREAK_SLOTS on first use rather than at import"""
+    if not _time_slots_ready:
+        calculate_time_slots(verbose=False)
+
+def demo_roster():
+    """Demo subjects, faculties and classes, built fresh on each call"""
+    # Define subjects with credits determining weekly hours
+    math = Subject("Mathematics", 4)     
+    physics = Subject("Physics", 4)
+    chemistry = Subject("Chemistry", 4)    
+    english = Subject("English", 4)
+    biology = Subject("Biology", 4)       
+    computer = Subject("Computer", 3)
+    history = Subject("History", 3)
+    geography = Subject("Geography", 3)
+
+    # Lab subjects with specific credit hours
+    physics_lab = Labs("Physics Lab", 2, 2)    # 2 credits = 2 consecutive hours once per week
+    chemistry_lab = Labs("Chemistry Lab", 2, 2) 
+    biology_lab = Labs("Biology Lab", 2, 2)
+    computer_lab = Labs("Computer Lab", 2, 2)
+
+    # List of subjects grouped by type
+    core_subjects = [math, physics, chemistry, english, biology]
+    non_core_subjects = [computer, history, geography]
+    lab_subjects = [physics_lab, chemistry_lab, biology_lab, computer_lab]
+
+    # Combined subject list
+    subjects = core_subjects + non_core_subjects + lab_subjects
+
+    # --- Define Faculties ---
+    faculties = [
+        Faculty("Dr. Math1", [math]),
+        Faculty("Dr. Math2", [math]),
+        Faculty("Dr. Math3", [math]),
+        Faculty("Dr. Phys1", [physics, physics_lab]),
+        Faculty("Dr. Phys2", [physics, physics_lab]),
+        Faculty("Dr. Chem1", [chemistry, chemistry_lab]),
+        Faculty("Dr. Chem2", [chemistry, chemistry_lab]),
+        Faculty("Dr. Chem3", [chemistry, chemistry_lab]),   
+        Faculty("Dr. Bio1", [biology, biology_lab]),
+        Faculty("Dr. Bio2", [biology, biology_lab]),
+        Faculty("Dr. Comp", [computer, computer_lab]),
+        Faculty("Dr. Comp2", [computer, computer_lab]),    # Added another computer teacher
+        Faculty("Dr. Eng1", [english]),
+        Faculty("Dr. Eng2", [english]),
+        Faculty("Dr. Hist", [history, geography]),
+        Faculty("Dr. Hist2", [history, geography])         # Added another history/geography teacher
+    ]
+
+    # --- Define Classes with Lab Distribution ---
+    classes = [
+        # Science Stream - Labs on different days
+        Class("11-A Sci", [
+            math, physics, chemistry, english,
+            physics_lab,    # Will be scheduled once per week
+            chemistry_lab   # Will be scheduled on a different day
+        ]),
+        Class("11-B Sci", [
+            math, physics, chemistry, english,
+            physics_lab,    # Once per week
+            chemistry_lab   # Different day from physics lab
+        ]),
+        Class("11-C Bio", [
+            math, biology, chemistry, english,
+            biology_lab,    # Once per week
+            chemistry_lab   # Different day from biology lab
+        ]),
+        # Computer Stream
+        Class("11-D Comp", [
+            math, computer, english, physics,
+            computer_lab,   # Once per week
+            physics_lab     # Different day from computer lab
+        ]),
+        # Humanities Stream
+        Class("11-E Hum", [
+            math, english, history, geography, computer,
+            computer_lab    # Once per week only
+        ])
+    ]
+    
+    return subjects, faculties, classes
+
+def demo_school():
+    """School built from the demo roster"""
+    _, faculties, classes = demo_roster()
+    return School(classes, faculties)
 
 def init_availability_scores(school):
-    """Initialize availability scores for all faculties"""
+    """Initialize availability scores and occupancy index for all faculties"""
     for faculty in school.get_faculties():
-        faculty.isfree_score = {}
-        for day in WORKDAYS:
-            faculty.isfree_score[day] = [10] * HOURS_PER_DAY  # 10 is max freshness
+        faculty.reset_occupancy()
 
-def choose_faculty(subject,assigned_faculties):
+def match_teachers_to_classes(school, budget, rng):
     """
-    Choose a faculty member who can teach the subject
-    and hasn't been assigned to this class yet
+    Assign teachers as a capacitated bipartite matching between
+    (class, subject) pairs and faculty. A faculty's capacity is its weekly
+    teaching hours and a pair weighs its subject's credit hours. Pairs are
+    placed heaviest first on the least-loaded qualified faculty with room;
+    when none has room, the shortest chain of reassignments that frees
+    enough hours is found by breadth-first search. A faculty still teaches
+    at most one subject per class.
     """
-    eligible_faculties = []
-    
-    for faculty in faculties:
-        # Check if faculty can teach this subject
-        can_teach = any(subj.get_name() == subject.get_name() for subj in faculty.get_subjects())
-        
-        # Check if faculty already teaches in this class
-        already_assigned = faculty in assigned_faculties
+    capacity = min(MAX_HOURS_PER_DAY, len(teaching_periods(BREAK_SLOTS))) * len(WORKDAYS)
+    
+    load = {faculty: 0 for faculty in school.faculties}
+    tie_break = {faculty: rng.random() for faculty in school.faculties}
+    
+    def weight(subject):
+        return required_hours(subject)
+    
+    def candidates(class_obj, subject):
+        """Qualified faculty, least loaded first"""
+        return sorted(school.qualified_faculty(subject),
+                      key=lambda f: (load[f], tie_break[f]))
+    
+    def move_in(faculty, class_obj, subject):
+        school.assign(class_obj, subject, faculty)
+        load[faculty] += weight(subject)
+    
+    def move_out(faculty, class_obj):
+        subject = school.classes_of(faculty)[class_obj]
+        school.unassign(class_obj, subject)
+        load[faculty] -= weight(subject)
+        return subject
+    
+    def augment(class_obj, subject):
+        """Find and apply the shortest reassignment chain that seats this pair"""
+        # BFS over faculty. parent[f] is (faculty that pushed a pair to f, class
+        # of that pair); incoming[f] is the pair f was asked to take.
+        queue = deque()
+        parent = {}
+        incoming = {}
+        for faculty in candidates(class_obj, subject):
+            parent[faculty] = None
+            incoming[faculty] = (class_obj, subject)
+            queue.append(faculty)
         
-        if can_teach and not already_assigned:
-            eligible_faculties.append(faculty)
+        while queue:
+            faculty = queue.popleft()
+            in_class, in_subject = incoming[faculty]
+            room = capacity - load[faculty]
+            
+            if in_class not in school.classes_of(faculty) and room >= weight(in_subject):
+                # Replay the chain backwards: each faculty hands its pushed pair
+                # to the next one and takes the pair it was asked for
+                while parent[faculty] is not None:
+                    previous, out_class = parent[faculty]
+                    out_subject = move_out(previous, out_class)
+                    move_in(faculty, out_class, out_subject)
+                    faculty = previous
+                move_in(faculty, class_obj, subject)
+                return True
+            
+            # Make room by pushing one of this faculty's pairs elsewhere; if it
+            # already teaches the incoming class, only that pair may move
+            teaches = school.classes_of(faculty)
+            if in_class in teaches:
+                movable = [in_class]
+            else:
+                movable = list(teaches)
+            for out_class in movable:
+                out_subject = teaches[out_class]
+                if room + weight(out_subject) < weight(in_subject):
+                    continue
+                for target in candidates(out_class, out_subject):
+                    if target not in parent:
+                        parent[target] = (faculty, out_class)
+                        incoming[target] = (out_class, out_subject)
+                        queue.append(target)
+        return False
+    
+    # Every (class, subject) pair that needs a teacher, heaviest first
+    pairs = [(class_obj, subject) for class_obj in school.classes for subject in class_obj.subjects]
+    rng.shuffle(pairs)
+    pairs.sort(key=lambda pair: -weight(pair[1]))
+    
+    for class_obj, subject in pairs:
+        if not budget.tick():
+            logger.warning(f"Search budget exhausted after {budget.nodes} nodes during teacher assignment")
+            return False
+        if not augment(class_obj, subject):
+            logger.warning(f"  No qualified faculty with {weight(subject)} free hours for "
+                           f"{subject.get_name()} in {class_obj.get_name()}")
+            return False
     
-    if eligible_faculties:
-        return random.choice(eligible_faculties)
-    return None
+    event(logger, "faculty_load",
+          f"  Faculty load: {min(load.values())}-{max(load.values())} of {capacity} hours per week",
+          min_hours=min(load.values()), max_hours=max(load.values()), capacity=capacity)
+    return True
 
-def assign_teachers_to_classes(school):
-    """Assign teachers to each class with backtracking"""
+def assign_teachers_to_classes(school, budget=None, rng=None, method=None):
+    """
+    Assign teachers to each class.
+    method is 'matching' (capacitated bipartite matching, balanced load)
+    or 'backtrack' (exhaustive backtracking, ignores load).
+    """
     
-    print("Starting teacher assignment...")
+    logger.info("Starting teacher assignment...")
     
-    def backtrack_assignment(class_index=0, subject_index=0):
-        # Base case: all classes processed
-        if class_index >= len(school.classes):
-            return True
-            
-        current_class = school.classes[class_index]
-        subjects_to_assign = current_class.subjects
+    if method is None:
+        method = BACKTRACK_SETTINGS['assignment']
+    
+    if budget is None:
+        budget = SearchBudget()
+    if rng is None:
+        rng = random.Random()
+    
+    # Every (class, subject) pair that needs a teacher, in assignment order
+    pairs = [(class_obj, subject) for class_obj in school.classes for subject in class_obj.subjects]
+    
+    def eligible_faculties_for(current_class, current_subject):
+        if logger.isEnabledFor(TRACE):
+            logger.log(TRACE, f"  Trying to assign {current_subject.get_name()} for {current_class.get_name()}")
         
-        # Base case: all subjects for current class assigned
-        if subject_index >= len(subjects_to_assign):
-            # Move to next class
-            return backtrack_assignment(class_index + 1, 0)
-            
-        current_subject = subjects_to_assign[subject_index]
-        print(f"  Trying to assign {current_subject.get_name()} for {current_class.get_name()}")
-        
-        # Find eligible faculties
-        eligible_faculties = []
-        for faculty in school.faculties:
-            can_teach = any(subj.get_name() == current_subject.get_name() for subj in faculty.get_subjects())
-            already_assigned = faculty in [f for f in current_class.faculties.values()]
-            
-            if can_teach and not already_assigned:
-                eligible_faculties.append(faculty)
+        assigned = set(current_class.faculties.values())
+        eligible_faculties = [faculty for faculty in school.qualified_faculty(current_subject)
+                              if faculty not in assigned]
         
         # Shuffle to try different faculties
-        random.shuffle(eligible_faculties)
+        rng.shuffle(eligible_faculties)
+        return eligible_faculties
+    
+    def backtrack_assignment():
+        # Explicit stack of [eligible faculties, next faculty index], one frame per pair
+        stack = []
+        backtracks = 0
+        max_depth = 0
+        
+        def done(success):
+            budget.metrics.add_search(0, backtracks, max_depth)
+            return success
         
-        # Try each eligible faculty
-        for faculty in eligible_faculties:
-            print(f"    Trying {faculty.get_name()} for {current_subject.get_name()}")
+        while True:
+            # Base case: every subject of every class assigned
+            if len(stack) == len(pairs):
+                return done(True)
             
-            # Tentatively assign faculty
-            current_class.faculties[current_subject] = faculty
+            current_class, current_subject = pairs[len(stack)]
+            stack.append([eligible_faculties_for(current_class, current_subject), 0])
+            max_depth = max(max_depth, len(stack))
             
-            # Move to next subject
-            if backtrack_assignment(class_index, subject_index + 1):
-                return True
+            while stack:
+                eligible_faculties, index = stack[-1]
+                current_class, current_subject = pairs[len(stack) - 1]
                 
-            # If failed, backtrack
-            del current_class.faculties[current_subject]
-            
-        print(f"  No valid faculty for {current_subject.get_name()} in {current_class.get_name()}")
-        # No faculty worked for this subject
-        return False
+                # Undo the faculty tried last time at this level
+                school.unassign(current_class, current_subject)
+                
+                if index >= len(eligible_faculties):
+                    if logger.isEnabledFor(TRACE):
+                        logger.log(TRACE, f"  No valid faculty for {current_subject.get_name()} "
+                                          f"in {current_class.get_name()}")
+                    stack.pop()
+                    backtracks += 1
+                    continue
+                
+                if not budget.tick():
+                    logger.warning(f"Search budget exhausted after {budget.nodes} nodes during teacher assignment")
+                    return done(False)
+                
+                faculty = eligible_faculties[index]
+                stack[-1][1] = index + 1
+                if logger.isEnabledFor(TRACE):
+                    logger.log(TRACE, f"    Trying {faculty.get_name()} for {current_subject.get_name()}")
+                
+                # Tentatively assign faculty and move to the next subject
+                school.assign(current_class, current_subject, faculty)
+                break
+            else:
+                return done(False)
     
     # Clear any previous assignments
-    for class_obj in school.classes:
-        class_obj.faculties = {}
-        
-    # Start backtracking
-    success = backtrack_assignment()
+    school.clear_assignments()
     
-    # Print results for debugging
+    nodes_before = budget.nodes
+    if method == 'matching':
+        success = match_teachers_to_classes(school, budget, rng)
+    else:
+        # Start backtracking
+        success = backtrack_assignment()
+    budget.metrics.add_search(budget.nodes - nodes_before, 0, 0)
+    
+    # Log results for debugging
     if (success):
-        print("Teacher assignment successful!")
-        for class_obj in school.classes:
-            print(f"\nClass: {class_obj.get_name()}")
-            for subject, faculty in class_obj.faculties.items():
-                print(f"  {subject.get_name()} -> {faculty.get_name()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            for class_obj in school.classes:
+                logger.debug(f"\nClass: {class_obj.get_name()}")
+                for subject, faculty in class_obj.faculties.items():
+                    logger.debug(f"  {subject.get_name()} -> {faculty.get_name()}")
     else:
-        print("Teacher assignment failed.")
+        logger.warning("Teacher assignment failed.")
         
     return success
 
-def check_availability_of_faculty(faculty, hour, day, school):
+def check_availability_of_faculty(faculty, hour, day, school, rejections=None):
     """
-    Check if faculty is available at the given hour and day
+    Check if faculty is available at the given hour and day.
+    Uses the faculty's occupancy index, so the check does not depend on
+    the number of classes in the school. A failed check is counted in
+    rejections (SolverMetrics.rejections) when given.
     """
     # Check if faculty is already teaching another class at this time
-    for class_obj in school.classes:
-        if day in class_obj.timetable and len(class_obj.timetable[day]) > hour:
-            slot = class_obj.timetable[day][hour]
-            # Check if slot is an Hour object (not a string like "BREAK")
-            if slot and not isinstance(slot, str) and slot.get_faculty() == faculty:
-                return False
+    if faculty.is_occupied(day, hour):
+        if rejections is not None:
+            rejections['faculty_clash'] += 1
+        return False
     
     # Check faculty's freshness score
-    if faculty.isfree_score.get(day, [10])[hour] < 2:  # Too tired
+    if faculty.isfree_score[day][hour] < MIN_FRESHNESS_SCORE:  # Too tired
+        if rejections is not None:
+            rejections['freshness'] += 1
         return False
     
-    # Count how many hours faculty has already taught today
-    hours_today = 0
-    for class_obj in school.classes:
-        if day in class_obj.timetable:
-            for h in range(len(class_obj.timetable[day])):
-                slot = class_obj.timetable[day][h]
-                # Again, check if slot is an Hour object
-                if slot and not isinstance(slot, str) and slot.get_faculty() == faculty:
-                    hours_today += 1
-    
     # Faculty reached max hours for the day
-    if hours_today >= MAX_HOURS_PER_DAY:
+    if faculty.hours_on(day) >= MAX_HOURS_PER_DAY:
+        if rejections is not None:
+            rejections['daily_max'] += 1
         return False
     
     return True
 
-def update_availability_score(faculty, hour, day):
-    """
-    Update faculty's availability score after teaching a class
-    """
-    # Decrease score for the current hour (faculty gets tired)
-    if day not in faculty.isfree_score:
-        faculty.isfree_score[day] = [10] * HOURS_PER_DAY
-    
-    # Teaching makes faculty tired (-4 points)
-    faculty.isfree_score[day][hour] -= 4
-    
-    # Teaching also affects adjacent hours (-2 points)
-    if hour > 0:
-        faculty.isfree_score[day][hour-1] -= 2
-    if hour < HOURS_PER_DAY - 1:
-        faculty.isfree_score[day][hour+1] -= 2
-
-def make_timetable(class_obj, school):
-    """Generate timetable with variable subject distribution across the week"""
-    
-    # Initialize empty timetable
+def init_timetable(class_obj):
+    """Lay out an empty timetable with the break slots filled in"""
     for day in WORKDAYS:
         class_obj.timetable[day] = [None] * HOURS_PER_DAY
         
@@ -363,474 +478,733 @@ def make_timetable(class_obj, school):
         for break_name, (break_slot, _) in BREAK_SLOTS.items():
             # Fix: Adjust from 1-indexed to 0-indexed for timetable array
             class_obj.timetable[day][break_slot - 1] = "BREAK"
+
+def make_timetable(class_obj, school, budget=None, rng=None):
+    """
+    Generate timetable with variable subject distribution across the week.
+    Every subject gets exactly its weekly credit hours; the remaining
+    periods are left free. Stops when the search budget runs out, leaving
+    the fullest partial timetable found in place.
+    """
+    if budget is None:
+        budget = SearchBudget()
+    if rng is None:
+        rng = random.Random()
+    
+    # Day order for this class only; the shared WORKDAYS list is never reordered
+    days = list(WORKDAYS)
+    if BACKTRACK_SETTINGS['randomize_order']:
+        rng.shuffle(days)
+    
+    # Initialize empty timetable
+    init_timetable(class_obj)
+    
+    metrics = budget.metrics
+    rejections = metrics.rejections
+    start_time = time.perf_counter()
+    start_nodes = budget.nodes
+    
+    # Work on the integer grid directly: cell codes instead of Hour objects
+    cells = class_obj.grid.cells
+    day_start = {day: class_obj.grid.offset(class_obj.row, day, 0) for day in WORKDAYS}
+    code_of = {subject: class_obj.grid.code(subject, faculty)
+               for subject, faculty in class_obj.faculties.items()}
     
     # Track which days have labs scheduled
     days_with_labs = set()
     
     # Track how many times each lab subject has been scheduled
     lab_subjects_scheduled = {
-        subject.get_name(): 0 for subject in class_obj.subjects 
+        subject: 0 for subject in class_obj.subjects 
         if isinstance(subject, Labs)
     }
     
-    # Track subject distribution across days
-    subject_day_count = {}
-    
-    # Track subject positions (at which hour they appear) for each day
-    subject_positions = {}
+    # Subjects ranked by distribution per slot: spread over days and hours
+    distribution = DistributionQueue(class_obj.faculties, WORKDAYS, HOURS_PER_DAY, rng)
     
-    for subject in class_obj.subjects:
-        subject_name = subject.get_name()
-        subject_day_count[subject_name] = {day: 0 for day in WORKDAYS}
-        subject_positions[subject_name] = {hour: 0 for hour in range(HOURS_PER_DAY)}
+    # Credit hours each subject still needs this week
+    remaining_hours = {
+        subject: required_hours(subject) for subject in class_obj.faculties
+    }
     
-    def get_subject_distribution_score(subject, day, hour):
-        """Calculate score based on distribution (lower is better)"""
-        subject_name = subject.get_name()
-        score = 0
+    def try_place(subject, day, hour):
+        """Place subject at (day, hour) if all constraints allow it; returns the placement or None"""
+        faculty = class_obj.faculties[subject]
+        slots_needed = subject.get_labslots() if isinstance(subject, Labs) else 1
         
-        # Factor 1: How many times this subject already appears on this day
-        day_count = subject_day_count[subject_name][day] 
-        score += day_count * 3  # Higher penalty for concentration on same day
+        # Skip subjects that already have all their weekly hours
+        if remaining_hours[subject] < slots_needed:
+            return None
         
-        # Factor 2: How many times subject appears at this hour across all days
-        position_count = subject_positions[subject_name][hour]
-        score += position_count * 4  # Higher penalty for same time slot pattern
+        if not check_availability_of_faculty(faculty, hour, day, school, rejections):
+            return None
         
-        # Add randomization factor to prevent predictable patterns
-        score += random.randint(0, 1)
+        if isinstance(subject, Labs):
+            # Skip if this specific lab has already been scheduled this week
+            if lab_subjects_scheduled[subject] >= LAB_CONSTRAINTS['lab_frequency']:
+                rejections['lab_frequency'] += 1
+                return None
+            
+            # Check if this day already has a lab scheduled
+            if day in days_with_labs:
+                rejections['labs_per_day'] += 1
+                return None  # Skip - no two labs on the same day
+            
+            # Check if we have enough consecutive slots
+            if hour + slots_needed > HOURS_PER_DAY:
+                rejections['consecutive_slots'] += 1
+                return None  # Not enough hours left in the day
+            
+            # Check if any of the consecutive slots are already filled
+            for h in range(hour, hour + slots_needed):
+                if cells[day_start[day] + h] != FREE_CODE:
+                    rejections['consecutive_slots'] += 1
+                    return None  # Skip - consecutive slots not available
+                
+            # Check if faculty is available for all consecutive slots
+            for h in range(hour, hour + slots_needed):
+                if not check_availability_of_faculty(faculty, h, day, school, rejections):
+                    return None  # Skip - faculty not available for all slots
+            
+            # Mark this day as having a lab and count this lab subject
+            days_with_labs.add(day)
+            lab_subjects_scheduled[subject] += 1
         
-        return score
-    
-    def backtrack_timetable(day_idx=0, hour=0, iterations=0):
-        # Check for excessive backtracking
-        iterations += 1
-        if iterations > BACKTRACK_SETTINGS['max_iterations']:
-            print(f"Reached maximum iterations ({BACKTRACK_SETTINGS['max_iterations']}) for class {class_obj.get_name()}")
-            return False
+        hours = range(hour, hour + slots_needed)
+        remaining_hours[subject] -= slots_needed
+        for h in hours:
+            cells[day_start[day] + h] = code_of[subject]
+            faculty.occupy(day, h)  # Also lowers freshness; unplace gives it back
             
-        # Base case: completed timetable
-        if day_idx >= len(WORKDAYS):
-            return True
+            # Update distribution tracking
+            distribution.add(subject, day, h)
         
-        day = WORKDAYS[day_idx]
+        return (subject, faculty, day, hours)
+    
+    def unplace(placement):
+        """Undo a placement made by try_place"""
+        subject, faculty, day, hours = placement
+        remaining_hours[subject] += len(hours)
+        for h in hours:
+            cells[day_start[day] + h] = FREE_CODE
+            faculty.release(day, h)
+            distribution.remove(subject, day, h)
         
-        # Move to next day if all hours are filled for this day
-        if hour >= HOURS_PER_DAY:
-            return backtrack_timetable(day_idx + 1, 0, iterations)
+        if isinstance(subject, Labs):
+            days_with_labs.remove(day)
+            lab_subjects_scheduled[subject] -= 1
+    
+    def next_open_slot(day_idx, hour):
+        """First empty slot at or after (day_idx, hour), or None past the end of the week"""
+        while day_idx < len(days):
+            if hour >= HOURS_PER_DAY:
+                # Move to next day if all hours are filled for this day
+                day_idx += 1
+                hour = 0
+            elif cells[day_start[days[day_idx]] + hour] != FREE_CODE:
+                # Skip slots that are already filled (breaks, lab continuations)
+                hour += 1
+            else:
+                return day_idx, hour
+        return None
+    
+    def backtrack_timetable():
+        # Explicit stack of [day index, hour, candidates, next candidate index, choice].
+        # A None candidate leaves the hour free; choice is a placement, () for a
+        # free hour, or None when nothing is chosen at that level yet.
+        stack = []
+        backtracks = 0
+        max_depth = 0
+        
+        # Placements of the fullest timetable reached so far, and the hours each fills
+        best = []
+        best_filled = 0
+        filled = 0
         
-        # Skip slots that are already filled (breaks)
-        if class_obj.timetable[day][hour] is not None:
-            return backtrack_timetable(day_idx, hour + 1, iterations)
+        def done(success):
+            metrics.add_class(class_obj.get_name(), time.perf_counter() - start_time,
+                              budget.nodes - start_nodes, backtracks, max_depth, success)
+            return success
         
-        # Try to schedule a subject for this hour
-        subjects_to_try = list(class_obj.faculties.keys())
+        # Open periods that may stay free without starving any subject of its credits
+        open_slots = sum(1 for day in days for h in range(HOURS_PER_DAY)
+                         if cells[day_start[day] + h] == FREE_CODE)
+        free_left = open_slots - sum(remaining_hours.values())
+        if free_left < 0:
+            logger.warning(f"Not enough periods for the credit hours of {class_obj.get_name()}")
+            return done(False)
         
-        # Sort subjects by distribution score (lower is better)
-        subjects_to_try.sort(key=lambda s: get_subject_distribution_score(s, day, hour))
+        def restore_best():
+            for frame in reversed(stack):
+                if frame[4]:
+                    unplace(frame[4])
+            for subject, faculty, day, hours in best:
+                try_place(subject, day, hours[0])
         
-        for subject in subjects_to_try:
-            faculty = class_obj.faculties[subject]
+        position = next_open_slot(0, 0)
+        while True:
+            # Base case: completed timetable
+            if position is None:
+                return done(True)
+            
+            day_idx, hour = position
+            day = days[day_idx]
+            
+            # Try to schedule a subject that still needs hours
+            # Subjects in distribution order (lower score first), already kept sorted
+            candidates = [s for s in distribution.ordered(day, hour) if remaining_hours[s] > 0]
+            
+            # Spread free periods over the week: leave this hour free first with
+            # probability equal to the share of open periods that must stay free
+            if free_left > 0 and rng.random() * (free_left + sum(remaining_hours.values())) < free_left:
+                candidates.insert(0, None)
+            else:
+                candidates.append(None)
+            stack.append([day_idx, hour, candidates, 0, None])
+            if len(stack) > max_depth:
+                max_depth = len(stack)
             
-            if check_availability_of_faculty(faculty, hour, day, school):
-                if isinstance(subject, Labs):
-                    # Skip if this specific lab has already been scheduled this week
-                    if lab_subjects_scheduled[subject.get_name()] >= LAB_CONSTRAINTS['lab_frequency']:
+            while stack:
+                frame = stack[-1]
+                day_idx, hour, candidates, index, choice = frame
+                
+                # If scheduling the following hours failed, backtrack
+                if choice:
+                    unplace(choice)
+                    filled -= len(choice[3])
+                elif choice is not None:
+                    free_left += 1
+                frame[4] = None
+                
+                # Every subject and the free hour have been tried here
+                if index >= len(candidates):
+                    stack.pop()
+                    backtracks += 1
+                    continue
+                
+                frame[3] = index + 1
+                subject = candidates[index]
+                if subject is None:
+                    # Leave the hour free only if the open periods still cover the outstanding credits
+                    if free_left == 0:
                         continue
-                    
-                    # Check if this day already has a lab scheduled
-                    if day in days_with_labs:
-                        continue  # Skip - no two labs on the same day
-                    
-                    # Check if we have enough consecutive slots
-                    slots_needed = subject.get_labslots()
-                    if hour + slots_needed > HOURS_PER_DAY:
-                        continue  # Not enough hours left in the day
-                    
-                    # Check if any of the consecutive slots are already filled
-                    slots_available = True
-                    for h in range(hour, hour + slots_needed):
-                        if h >= HOURS_PER_DAY or class_obj.timetable[day][h] is not None:
-                            slots_available = False
-                            break
-                    
-                    if not slots_available:
-                        continue  # Skip - consecutive slots not available
-                        
-                    # Check if faculty is available for all consecutive slots
-                    faculty_available = True
-                    for h in range(hour, hour + slots_needed):
-                        if not check_availability_of_faculty(faculty, h, day, school):
-                            faculty_available = False
-                            break
-                            
-                    if not faculty_available:
-                        continue  # Skip - faculty not available for all slots
-                        
-                    # Assign lab to all consecutive slots
-                    for h in range(hour, hour + slots_needed):
-                        class_obj.timetable[day][h] = Hour(subject, faculty)
-                        update_availability_score(faculty, h, day)
-                    
-                    # Mark this day as having a lab and count this lab subject
-                    days_with_labs.add(day)
-                    lab_subjects_scheduled[subject.get_name()] += 1
-                    
-                    # Update distribution tracking for all lab slots
-                    for h in range(hour, hour + slots_needed):
-                        subject_day_count[subject.get_name()][day] += 1
-                        subject_positions[subject.get_name()][h] += 1
-                        
-                    # Move past the lab slots
-                    if backtrack_timetable(day_idx, hour + slots_needed, iterations):
-                        return True
-                        
-                    # If scheduling failed, backtrack
-                    for h in range(hour, hour + slots_needed):
-                        class_obj.timetable[day][h] = None
-                        subject_day_count[subject.get_name()][day] -= 1
-                        subject_positions[subject.get_name()][h] -= 1
-                    
-                    days_with_labs.remove(day)
-                    lab_subjects_scheduled[subject.get_name()] -= 1
+                    free_left -= 1
+                    frame[4] = ()
+                    next_hour = hour + 1
                 else:
-                    # Regular subject (single slot)
-                    class_obj.timetable[day][hour] = Hour(subject, faculty)
-                    update_availability_score(faculty, hour, day)
-                    
-                    # Update distribution tracking
-                    subject_day_count[subject.get_name()][day] += 1
-                    subject_positions[subject.get_name()][hour] += 1
-                    
-                    # Move to the next hour
-                    if backtrack_timetable(day_idx, hour + 1, iterations):
-                        return True
-                    
-                    # If scheduling next hours failed, backtrack
-                    class_obj.timetable[day][hour] = None
-                    subject_day_count[subject.get_name()][day] -= 1
-                    subject_positions[subject.get_name()][hour] -= 1
-                        
-        # Couldn't find a valid subject-faculty, leave hour empty and try next hour
-        class_obj.timetable[day][hour] = None
-        return backtrack_timetable(day_idx, hour + 1, iterations)
-    
-    # Add randomization to initial assignment order for diversity
-    if BACKTRACK_SETTINGS['randomize_order']:
-        random.shuffle(WORKDAYS)
+                    placement = try_place(subject, days[day_idx], hour)
+                    if placement is None:
+                        continue
+                    frame[4] = placement
+                    filled += len(placement[3])
+                    next_hour = hour + len(placement[3])
+                
+                if filled > best_filled:
+                    best = [f[4] for f in stack if f[4]]
+                    best_filled = filled
+                
+                if not budget.tick():
+                    logger.warning(f"Search budget exhausted after {budget.nodes} nodes "
+                                   f"for class {class_obj.get_name()}")
+                    restore_best()
+                    return done(False)
+                
+                position = next_open_slot(day_idx, next_hour)
+                break
+            else:
+                restore_best()
+                return done(False)
     
     return backtrack_timetable()
 
-def schedule_backtrack(school):
-    """Main scheduling function with backtracking"""
+def make_timetable_csp(class_obj, school, budget=None, rng=None):
+    """Generate timetable for one class with the constraint-propagation solver"""
+    init_timetable(class_obj)
+    
+    start_time = time.perf_counter()
+    solver = ConstraintSolver(school, [class_obj], budget, rng)
+    success = solver.solve()
+    solver.budget.metrics.add_class(class_obj.get_name(), time.perf_counter() - start_time,
+                                    solver.nodes, solver.backtracks, solver.max_depth, success)
+    event(logger, "class_solved",
+          f"  {class_obj.get_name()}: {solver.nodes} nodes, {solver.backtracks} backtracks, "
+          f"{solver.restarts} restarts",
+          class_name=class_obj.get_name(), success=success, nodes=solver.nodes,
+          backtracks=solver.backtracks, restarts=solver.restarts)
+    return success
+
+def make_school_timetables(school, budget=None, rng=None):
+    """
+    Generate timetables for all classes in one search space, so a conflict
+    in a late class can undo placements made for an earlier one. That does
+    not make it the better mode everywhere: the single search grows with
+    the school, and on tight synthetic schools (benchmark.py) sequential
+    csp solves as many schools or more. Benchmark both on the real roster.
+    """
+    for class_obj in school.classes:
+        init_timetable(class_obj)
+    
+    solver = ConstraintSolver(school, budget=budget, rng=rng)
+    success = solver.solve()
+    solver.budget.metrics.add_search(solver.nodes, solver.backtracks, solver.max_depth)
+    event(logger, "school_solved",
+          f"  Whole school: {solver.nodes} nodes, {solver.backtracks} backtracks, {solver.restarts} restarts",
+          success=success, nodes=solver.nodes, backtracks=solver.backtracks, restarts=solver.restarts)
+    return success
+
+def schedule_backtrack(school, engine=None, mode=None, attempts=None, budget=None, seed=None,
+                       optimize=None, use_cache=None):
+    """
+    Main scheduling function with backtracking.
+    engine selects the per-class solver: 'backtrack' (slot-order recursion)
+    or 'csp' (forward checking with MRV, see scheduler.py).
+    mode is 'sequential' (one class after another) or 'simultaneous'
+    (all classes in one constraint-propagation search; engine is ignored),
+    see make_school_timetables for when each does better.
+    All stages share one search budget: BACKTRACK_SETTINGS['max_iterations']
+    nodes and BACKTRACK_SETTINGS['time_limit'] seconds.
+    attempts > 1 runs that many independently seeded solves in parallel
+    (see schedule_parallel). budget may be passed in to share or cancel it.
+    seed makes the solve reproducible: every randomized step draws from one
+    random.Random(seed), so the same seed and input give the same timetable
+    and node count. The optimizer then runs its full max_moves instead of
+    stopping on the clock (see improve_timetables).
+    optimize runs the local-search improvement stage on a successful solve
+    (default OPTIMIZER_SETTINGS['enabled']).
+    use_cache looks the inputs up in the on-disk solution cache first and
+    stores successful results in it (default CACHE_SETTINGS['enabled']);
+    a near match warm-starts the solve (see cache.py). Solves without a
+    seed skip the cache, since each is meant to give a new timetable.
+    Returns a SolveResult, true on success, whose metrics record nodes,
+    backtracks, search depth, time per stage and class, and constraint
+    rejections (see SolverMetrics).
+    """
+    if engine is None:
+        engine = BACKTRACK_SETTINGS['engine']
+    if mode is None:
+        mode = BACKTRACK_SETTINGS['mode']
+    if attempts is None:
+        attempts = BACKTRACK_SETTINGS['parallel_attempts']
+    if seed is None:
+        seed = BACKTRACK_SETTINGS['seed']
+    if optimize is None:
+        optimize = OPTIMIZER_SETTINGS['enabled']
+    if use_cache is None:
+        use_cache = CACHE_SETTINGS['enabled']
+    ensure_time_slots()
+    if budget is None:
+        budget = SearchBudget()
+    metrics = budget.metrics
+    start = time.perf_counter()
+    
+    # Identical inputs were solved before: load that result without searching
+    cache = SolutionCache() if use_cache and seed is not None else None
+    if cache is not None:
+        with metrics.timed('cache'):
+            inputs = describe_inputs(school, BREAK_SLOTS, seed, engine=engine, mode=mode,
+                                     attempts=attempts, optimize=optimize)
+            digest = input_digest(inputs)
+            cached = cache.get(digest)
+            if cached is not None:
+                apply_timetables(school, cached)
+        if cached is not None:
+            event(logger, "cache_hit", f"Loaded cached timetables ({digest[:12]})", key=digest)
+            return SolveResult(True, metrics, 'cache')
+    
+    # Reject impossible configurations before spending any search budget
+    with metrics.timed('feasibility'):
+        report = check_feasibility(school, BREAK_SLOTS)
+    if report.errors or report.warnings:
+        logger.log(logging.ERROR if report.errors else logging.WARNING, str(report))
+    if not report.is_feasible():
+        event(logger, "infeasible", "Configuration is infeasible; not solving", logging.ERROR,
+              errors=len(report.errors))
+        return SolveResult(False, metrics, 'infeasible')
+    
+    rng = random.Random(seed)
+    success = False
+    source = 'search'
+    nearest = cache.nearest(inputs) if cache is not None else None
+    if nearest is not None:
+        similarity, cached = nearest
+        event(logger, "warm_start", f"Warm start from a cached solution ({similarity:.0%} similar inputs)",
+              similarity=round(similarity, 3))
+        with metrics.timed('warm_start'):
+            success = warm_start(school, cached, BREAK_SLOTS, rng, metrics)
+        source = 'warm_start'
+    if not success:
+        if attempts > 1:
+            with metrics.timed('parallel'):
+                success = schedule_parallel(school, attempts, engine=engine, mode=mode, seed=seed,
+                                            metrics=metrics, cancel=budget.cancel)
+            source = 'parallel'
+        else:
+            success = solve_school(school, engine, mode, budget, rng)
+            source = 'search'
+    
+    # Improve the accepted timetables: fewer gaps, repeats and shortfalls
+    if success and optimize:
+        with metrics.timed('optimize'):
+            improve_timetables(school, rng, budget.cancel, seeded=seed is not None)
+    if success and cache is not None:
+        with metrics.timed('cache'):
+            cache.put(digest, inputs, serialize_timetables(school))
+    if success:
+        # Per-faculty view of the placed lessons, for display and export
+        school.index_faculty_timetables()
+    event(logger, "solve_finished",
+          f"{'Solved' if success else 'Failed to solve'} {len(school.classes)} classes "
+          f"in {time.perf_counter() - start:.2f} s",
+          logging.INFO if success else logging.WARNING,
+          success=bool(success), classes=len(school.classes), engine=engine, mode=mode, seed=seed,
+          seconds=round(time.perf_counter() - start, 4), nodes=metrics.nodes,
+          backtracks=metrics.backtracks, source=source)
+    return SolveResult(success, metrics, source)
+
+def solve_school(school, engine, mode, budget, rng):
+    """One solve: teacher assignment, then the timetables of every class"""
+    build_timetable = make_timetable_csp if engine == 'csp' else make_timetable
+    if budget is None:
+        budget = SearchBudget()
     
     # Initialize availability scores
     init_availability_scores(school)
     
     # First assign teachers to classes
-    teacher_assignment_success = assign_teachers_to_classes(school)
+    with budget.metrics.timed('teacher_assignment'):
+        teacher_assignment_success = assign_teachers_to_classes(school, budget, rng)
     if not teacher_assignment_success:
-        print("Failed to assign teachers to classes. Check faculty availability.")
+        logger.warning("Failed to assign teachers to classes. Check faculty availability.")
         return False
     
-    print("Teacher assignment successful!")
+    logger.info("Teacher assignment successful!")
     
-    # Then create timetables for each class
-    for class_obj in school.classes:
-        timetable_success = make_timetable(class_obj, school)
-        if not timetable_success:
-            print(f"Failed to create timetable for {class_obj.get_name()}")
-            return False
+    with budget.metrics.timed('timetables'):
+        if mode == 'simultaneous':
+            if not make_school_timetables(school, budget, rng):
+                logger.warning("Failed to create timetables for the whole school")
+                return False
+            return True
+        
+        # Then create timetables for each class
+        for class_obj in school.classes:
+            timetable_success = build_timetable(class_obj, school, budget, rng)
+            if not timetable_success:
+                logger.warning(f"Failed to create timetable for {class_obj.get_name()}")
+                return False
             
     return True
 
-def export_timetables(school):
-    """Export timetables to text files with subject abbreviations and time slots"""
-    
-    # Create abbreviations for subjects
-    subject_abbreviations = {
-        "Mathematics": "MAT",
-        "Physics": "PHY",
-        "Chemistry": "CHM",
-        "Biology": "BIO", 
-        "English": "ENG",
-        "Computer": "COM",
-        "History": "HIS",
-        "Geography": "GEO",
-        "Physics Lab": "PLB",
-        "Chemistry Lab": "CLB",
-        "Biology Lab": "BLB",
-        "Computer Lab": "CPL"  # Using CPL to avoid confusion with Chemistry Lab
-    }
+def improve_timetables(school, rng=None, cancel=None, seeded=False):
+    """
+    Run the local-search optimizer on solved timetables; returns (cost before, cost after).
+    An unseeded run stops after OPTIMIZER_SETTINGS['max_moves'] moves or
+    'time_limit' seconds. A seeded run stops on max_moves alone, so its
+    result does not depend on machine speed; 'seeded_time_cap' only stops a
+    runaway run, and says so, since that result is no longer reproducible.
+    """
+    time_limit = OPTIMIZER_SETTINGS['seeded_time_cap' if seeded else 'time_limit']
+    budget = SearchBudget(max_nodes=OPTIMIZER_SETTINGS['max_moves'], time_limit=time_limit, cancel=cancel)
+    optimizer = TimetableOptimizer(school, budget, rng=rng)
+    before, after = optimizer.optimize()
+    cancelled = cancel is not None and cancel.is_set()
+    if seeded and budget.exhausted and budget.nodes <= budget.max_nodes and not cancelled:
+        event(logger, "optimizer_time_cap",
+              f"Optimizer stopped by the {time_limit} s cap after {optimizer.moves} of "
+              f"{budget.max_nodes} moves; this seeded result depends on machine speed",
+              logging.WARNING, moves=optimizer.moves, max_moves=budget.max_nodes, seconds=time_limit)
+    event(logger, "optimized",
+          f"Optimized timetables: cost {before} -> {after} "
+          f"({optimizer.moves} moves, {optimizer.accepted} accepted)",
+          cost_before=before, cost_after=after, moves=optimizer.moves, accepted=optimizer.accepted)
+    return before, after
+
+def timetable_quality(school):
+    """
+    Score the current timetables without printing anything.
+    Returns (credit hour shortfall, free periods); lower is better for both.
+    """
+    shortfall = 0
+    free_periods = 0
+    for class_obj in school.classes:
+        actual_hours = {}
+        for day in WORKDAYS:
+            for slot in class_obj.timetable.get(day, []):
+                if slot is None:
+                    free_periods += 1
+                elif slot != "BREAK":
+                    name = slot.get_subject().get_name()
+                    actual_hours[name] = actual_hours.get(name, 0) + 1
+        for subject in class_obj.subjects:
+            shortfall += max(subject.get_credits() - actual_hours.get(subject.get_name(), 0), 0)
+    return shortfall, free_periods
+
+def serialize_timetables(school):
+    """Plain-data copy of teacher assignments and timetables, keyed by names"""
+    assignments = {}
+    timetables = {}
+    for class_obj in school.classes:
+        assignments[class_obj.get_name()] = {
+            subject.get_name(): faculty.get_name()
+            for subject, faculty in class_obj.faculties.items()
+        }
+        timetables[class_obj.get_name()] = {
+            day: [
+                slot if slot is None or slot == "BREAK"
+                else [slot.get_subject().get_name(), slot.get_faculty().get_name()]
+                for slot in slots
+            ]
+            for day, slots in class_obj.timetable.items()
+        }
+    return {"assignments": assignments, "timetables": timetables}
+
+def apply_timetables(school, data):
+    """
+    Load a serialized result into the school's own objects and rebuild
+    faculty occupancy, freshness and timetables from the placed lessons
+    """
+    faculty_by_name = {faculty.get_name(): faculty for faculty in school.faculties}
+    init_availability_scores(school)
     
-    # Create abbreviations for weekdays
-    day_abbreviations = {
-        "Monday": "MON",
-        "Tuesday": "TUE",
-        "Wednesday": "WED", 
-        "Thursday": "THU",
-        "Friday": "FRI"
+    school.clear_assignments()
+    for class_obj in school.classes:
+        subject_by_name = {subject.get_name(): subject for subject in class_obj.subjects}
+        for subject, faculty in data["assignments"][class_obj.get_name()].items():
+            school.assign(class_obj, subject_by_name[subject], faculty_by_name[faculty])
+        class_obj.timetable = {}
+        for day, slots in data["timetables"][class_obj.get_name()].items():
+            row = []
+            for hour, slot in enumerate(slots):
+                if slot is None or slot == "BREAK":
+                    row.append(slot)
+                    continue
+                subject, faculty = subject_by_name[slot[0]], faculty_by_name[slot[1]]
+                row.append(Hour(subject, faculty))
+                faculty.occupy(day, hour)
+            class_obj.timetable[day] = row
+    school.index_faculty_timetables()
+
+# Set in each worker process by init_solve_worker; stops its search early
+_worker_cancel = None
+
+def init_solve_worker(cancel):
+    global _worker_cancel
+    _worker_cancel = cancel
+
+def solve_attempt(school, seed, engine, mode):
+    """
+    One seeded solve, run in a worker process.
+    Returns a picklable summary; the worker's school copy is discarded.
+    """
+    budget = SearchBudget(cancel=_worker_cancel)
+    # Attempt progress would interleave across workers; the parent reports outcomes
+    with quiet(logging.ERROR):
+        success = schedule_backtrack(school, engine=engine, mode=mode, attempts=1,
+                                     budget=budget, seed=seed, optimize=False, use_cache=False)
+    shortfall, free_periods = timetable_quality(school)
+    return {
+        "seed": seed,
+        "success": bool(success),
+        "metrics": success.metrics.to_dict(),
+        "shortfall": shortfall,
+        "free_periods": free_periods,
+        "result": serialize_timetables(school),
     }
+
+def schedule_parallel(school, attempts, workers=None, engine=None, mode=None, stop_at_first=None,
+                      seed=None, metrics=None, cancel=None, start_method=None):
+    """
+    Run independently seeded solves across a process pool.
+    The attempt seeds are drawn from random.Random(seed).
+    With stop_at_first the first successful attempt wins and pending ones
+    are cancelled; otherwise all attempts run and the best by
+    (success, shortfall, free periods) is kept. The winner is applied to
+    school in this process and its metrics are added to `metrics`.
+    Setting the optional `cancel` event stops the attempts still running;
+    the best finished one is kept. start_method picks how workers start
+    ('fork', 'spawn' or 'forkserver'; default
+    BACKTRACK_SETTINGS['parallel_start_method'], None for the platform's);
+    under spawn the school reaches the workers only by pickling.
+    """
+    # Process pools are only needed here; single solves skip importing them
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+    import multiprocessing
+    if workers is None:
+        workers = BACKTRACK_SETTINGS['parallel_workers'] or os.cpu_count()
+    if stop_at_first is None:
+        stop_at_first = BACKTRACK_SETTINGS['stop_at_first_success']
+    if start_method is None:
+        start_method = BACKTRACK_SETTINGS['parallel_start_method']
+    context = multiprocessing.get_context(start_method)
+    
+    seed_rng = random.Random(seed)
+    seeds = [seed_rng.randrange(2**31) for _ in range(attempts)]
+    logger.info(f"Running {attempts} solver attempts on {workers} workers...")
+    
+    best = None
+    stop = context.Event()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_solve_worker,
+                             initargs=(stop,)) as executor:
+        futures = [executor.submit(solve_attempt, school, seed, engine, mode) for seed in seeds]
+        pending = set(futures)
+        while pending and not stop.is_set():
+            # Wake up now and then, so a cancel from the caller is noticed
+            finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            if cancel is not None and cancel.is_set():
+                stop.set()
+            for future in finished:
+                outcome = future.result()
+                event(logger, "parallel_attempt",
+                      f"  Seed {outcome['seed']}: {'solved' if outcome['success'] else 'failed'}, "
+                      f"shortfall {outcome['shortfall']}, free periods {outcome['free_periods']}",
+                      seed=outcome["seed"], success=outcome["success"],
+                      shortfall=outcome["shortfall"], free_periods=outcome["free_periods"])
+                key = (not outcome["success"], outcome["shortfall"], outcome["free_periods"])
+                if best is None or key < (not best["success"], best["shortfall"], best["free_periods"]):
+                    best = outcome
+                if stop_at_first and outcome["success"]:
+                    stop.set()
+                    break
+        if stop.is_set():
+            # Drop queued attempts; running ones see the event and stop
+            for future in futures:
+                future.cancel()
     
-    for class_obj in school.classes:
-        with open(f"{class_obj.get_name()}_timetable.txt", "w") as f:
-            f.write(f"Timetable for {class_obj.get_name()}\n\n")
-            
-            # Header row with abbreviated day names
-            f.write("Period\tTime\t" + "\t".join([day_abbreviations[day] for day in WORKDAYS]) + "\n")
-            
-            # Data rows
-            for hour in range(HOURS_PER_DAY):
-                # Get actual time slot from calculated values
-                time_slot = TIME_SLOTS.get(hour+1, f"Period {hour+1}")
-                row = [f"Period {hour+1}", time_slot]
-                
-                for day in WORKDAYS:
-                    if day in class_obj.timetable and hour < len(class_obj.timetable[day]):
-                        slot = class_obj.timetable[day][hour]
-                        if slot == "BREAK":
-                            row.append("BRK")  # Abbreviation for break
-                        elif slot:
-                            # Use abbreviation instead of full name
-                            subject_name = slot.get_subject().get_name()
-                            abbr = subject_abbreviations.get(subject_name, subject_name[:3].upper())
-                            row.append(abbr)
-                        else:
-                            row.append("---")  # Empty slot
-                    else:
-                        row.append("---")
-                        
-                f.write("\t".join(row) + "\n")
-            
-            # Add subject-teacher assignments
-            f.write("\n\nSubject Assignments:\n")
-            f.write("-" * 40 + "\n")
-            
-            # Collect unique subject-teacher pairs
-            subject_teachers = {}
-            for day in WORKDAYS:
-                if day in class_obj.timetable:
-                    for hour_slot in class_obj.timetable[day]:
-                        if hour_slot and hour_slot != "BREAK":
-                            subject_name = hour_slot.get_subject().get_name()
-                            teacher_name = hour_slot.get_faculty().get_name()
-                            subject_teachers[subject_name] = teacher_name
-            
-            # Write the assignments
-            for subject, teacher in sorted(subject_teachers.items()):
-                abbr = subject_abbreviations.get(subject, subject[:3].upper())
-                f.write(f"{subject} ({abbr}): {teacher}\n")
-            
-            # Add abbreviation legend
-            f.write("\n\nAbbreviation Key:\n")
-            f.write("-" * 40 + "\n")
-            f.write("BRK: Break\n")
-            f.write("---: Free Period\n")
-            
-            # Only include abbreviations for subjects in this class
-            used_subjects = set()
-            for day in WORKDAYS:
-                if day in class_obj.timetable:
-                    for hour_slot in class_obj.timetable[day]:
-                        if hour_slot and hour_slot != "BREAK":
-                            used_subjects.add(hour_slot.get_subject().get_name())
-            
-            # Write legend for used subjects
-            for subject in sorted(used_subjects):
-                abbr = subject_abbreviations.get(subject, subject[:3].upper())
-                f.write(f"{abbr}: {subject}\n")
-            
-        print(f"Exported timetable for {class_obj.get_name()}")
+    if best is None:
+        return False
+    apply_timetables(school, best["result"])
+    if metrics is not None:
+        metrics.merge(best["metrics"])
+    logger.info(f"Using result of seed {best['seed']}")
+    return best["success"]
+
+def export_timetables(school, directory=".", formats=None, archive=None):
+    """
+    Export class and faculty timetables as CSV, JSON and iCalendar files
+    (see exporter.py); formats and archive default to EXPORT_SETTINGS.
+    Returns the files written.
+    """
+    from exporter import export_school
+    ensure_time_slots()
+    return export_school(school, TIME_SLOTS, directory, formats, archive)
 
 # Also update the GUI to use abbreviations for consistency
 def create_gui(school):
     """Create a simple GUI to display timetables with abbreviations"""
-    # Import the TIME_SLOTS from config
+    # tkinter is only needed here, so headless solves never import it
+    import tkinter as tk
+    from tkinter import ttk
+    from background import BackgroundSolve
+    from timetable_view import ClassTimetable, FacultyTimetable
+    ensure_time_slots()
+    solve = None  # The BackgroundSolve of a running Recreate
     
     # Recreate function to regenerate timetable
     def recreate_timetable():
-        # Hide current window
-        root.withdraw()
-        
-        print("\nRecreating timetable...")
+        nonlocal solve
+        logger.info("\nRecreating timetable...")
         
-        # Reset school data
-        for class_obj in school.get_classes():
-            class_obj.timetable = {}
+        # Solve on a worker thread so the window stays responsive;
+        # a new timetable is wanted, not the cached one being replaced
+        solve = BackgroundSolve(school, use_cache=False).start()
+        recreate_btn.state(["disabled"])
+        export_btn.state(["disabled"])
+        cancel_btn.state(["!disabled"])
+        status.set("Solving...")
+        root.after(100, poll_solve)
+    
+    def poll_solve():
+        for record in solve.poll():
+            if record.levelno >= logging.WARNING:
+                status.set(record.getMessage().strip())
+        if not solve.finished:
+            # Show only the counters this kind of solve fills in
+            progress = []
+            if solve.classes_done is not None:
+                progress.append(f"{solve.classes_done}/{len(school.classes)} classes")
+            if solve.attempts_done is not None:
+                progress.append(f"{solve.attempts_done}/{solve.attempts} attempts")
+            if solve.nodes is not None:
+                progress.append(f"{solve.nodes} nodes")
+            if solve.best_cost is not None:
+                progress.append(f"best cost {solve.best_cost}")
+            status.set(f"Solving: {', '.join(progress)}")
+            root.after(100, poll_solve)
+            return
         
-        # Reinitialize availability scores and generate new timetable
-        success = schedule_backtrack(school)
-        
-        if success:
-            print("Successfully recreated timetables!")
+        if solve.result and not solve.cancelled:
+            logger.info("Successfully recreated timetables!")
             # Run analysis on new timetable
             free_periods, shortfalls, faculty_needs = analyze_free_periods(school)
-            
-            # Close current window and create new one
-            root.destroy()
-            create_gui(school)
+        
+        # Redraw the changed cells of the tabs drawn so far; the rest draw when selected.
+        # A tab opened during the solve may show part of it, so refresh after a cancel too
+        changed = sum(view.refresh() for view in views.values())
+        if solve.result and not solve.cancelled:
+            status.set(f"Recreated timetables ({changed} cells changed in open tabs)")
+        elif solve.cancelled:
+            status.set("Cancelled; previous timetables kept")
         else:
-            print("Failed to recreate timetables. Try adjusting constraints.")
-            # Show window again if recreation failed
-            root.deiconify()
-    
-    # Create abbreviations for subjects
-    subject_abbreviations = {
-        "Mathematics": "MAT",
-        "Physics": "PHY",
-        "Chemistry": "CHM",
-        "Biology": "BIO", 
-        "English": "ENG",
-        "Computer": "COM",
-        "History": "HIS",
-        "Geography": "GEO",
-        "Physics Lab": "PLB",
-        "Chemistry Lab": "CLB",
-        "Biology Lab": "BLB",
-        "Computer Lab": "CPL"
-    }
+            logger.warning("Failed to recreate timetables. Try adjusting constraints.")
+            status.set("Failed to recreate timetables; previous timetables kept")
+        recreate_btn.state(["!disabled"])
+        export_btn.state(["!disabled"])
+        cancel_btn.state(["disabled"])
+    
+    def cancel_solve():
+        if solve is not None:
+            solve.cancel()
+            status.set("Cancelling...")
+    
+    def close():
+        # Stop a running solve rather than leave it searching after the window is gone
+        cancel_solve()
+        root.destroy()
     
     root = tk.Tk()
     root.title("Timetable Scheduler")
     root.geometry("1050x700")  # Made slightly wider for the time column
     
-    # Create a notebook (tabbed interface)
+    # Create a notebook (tabbed interface); a tab's timetable is drawn
+    # the first time it is selected
     notebook = ttk.Notebook(root)
     notebook.pack(fill='both', expand=True, padx=10, pady=10)
-    
-    # Create a tab for each class
+    break_periods = {period for period, _ in BREAK_SLOTS.values()}
+    tabs = {}   # Tab widget name -> (frame, class)
+    views = {}  # Tab widget name -> ClassTimetable
     for class_obj in school.classes:
         frame = ttk.Frame(notebook)
         notebook.add(frame, text=class_obj.get_name())
-        
-        # Create timetable grid with time column
-        ttk.Label(frame, text="Period", font=("Arial", 10, "bold")).grid(
-            row=0, column=0, padx=5, pady=5)
-        ttk.Label(frame, text="Time", font=("Arial", 10, "bold")).grid(
-            row=0, column=1, padx=10, pady=5)
-            
-        for col, day in enumerate(WORKDAYS, start=2):
-            ttk.Label(frame, text=day, font=("Arial", 10, "bold")).grid(
-                row=0, column=col, padx=5, pady=5)
-        
-        # In the create_gui function, update the loop that creates time labels
-        for row in range(HOURS_PER_DAY):
-            # Show period number
-            ttk.Label(frame, text=f"Period {row+1}", font=("Arial", 10)).grid(
-                row=row+1, column=0, padx=5, pady=5)
-                
-            # Show time slot - use the actual calculated time slots
-            time_text = TIME_SLOTS.get(row+1, f"Period {row+1}")
-            
-            # Create time label with special styling for breaks if this period is a break
-            is_break_period = False
-            for break_name, (break_period, _) in BREAK_SLOTS.items():
-                if break_period == row + 1:  # +1 because row is 0-indexed but BREAK_SLOTS uses 1-indexed periods
-                    is_break_period = True
-                    break
-            
-            if is_break_period:
-                time_label = tk.Label(frame, text=time_text, 
-                                     font=("Arial", 9), width=20,
-                                     bg="#FFD700")  # Gold for breaks
-            else:
-                time_label = ttk.Label(frame, text=time_text, font=("Arial", 9), width=20)
-            
-            time_label.grid(row=row+1, column=1, padx=2, pady=2)
-            
-            for col, day in enumerate(WORKDAYS, start=2):
-                if day in class_obj.timetable and row < len(class_obj.timetable[day]):
-                    slot = class_obj.timetable[day][row]
-                    
-                    if slot == "BREAK":
-                        text = "BRK"
-                        bg_color = "#FFD700"  # Gold for breaks
-                    elif slot:
-                        # Use abbreviation for the subject
-                        subject_name = slot.get_subject().get_name()
-                        abbr = subject_abbreviations.get(subject_name, subject_name[:3].upper())
-                        text = abbr
-                        
-                        # Color coding based on subject type
-                        if isinstance(slot.get_subject(), Labs):
-                            bg_color = "#FFCCCB"  # Light red for labs
-                        elif slot.get_subject() in core_subjects:
-                            bg_color = "#ADD8E6"  # Light blue for core
-                        else:
-                            bg_color = "#90EE90"  # Light green for others
-                    else:
-                        text = "---"
-                        bg_color = "#FFFFFF"  # White for free periods
-                        
-                    cell = tk.Label(frame, text=text, width=8, height=2, 
-                                   relief="solid", borderwidth=1, bg=bg_color,
-                                   justify="center")
-                    cell.grid(row=row+1, column=col, padx=2, pady=2, sticky="nsew")
-        
-        # Add legend frame below the timetable
-        legend_frame = ttk.LabelFrame(frame, text="Legend")
-        legend_frame.grid(row=HOURS_PER_DAY+2, column=0, columnspan=len(WORKDAYS)+2, 
-                          padx=10, pady=10, sticky="ew")
-        
-        # Rest of the legend code remains the same
-        # Add subject abbreviations to legend
-        row = 0
-        col = 0
-        
-        # Only include subjects in this class's timetable
-        used_subjects = set()
-        for day in WORKDAYS:
-            if day in class_obj.timetable:
-                for hour_slot in class_obj.timetable[day]:
-                    if hour_slot and hour_slot != "BREAK":
-                        used_subjects.add(hour_slot.get_subject())
-        
-        # Add break and free period to the legend
-        ttk.Label(legend_frame, text="BRK: Break", width=20).grid(row=row, column=col, padx=5, pady=2, sticky="w")
-        col += 1
-        if col >= 3:  # 3 columns in the legend
-            col = 0
-            row += 1
-            
-        ttk.Label(legend_frame, text="---: Free Period", width=20).grid(row=row, column=col, padx=5, pady=2, sticky="w")
-        col += 1
-        if col >= 3:
-            col = 0
-            row += 1
-        
-        # Add all subjects to the legend
-        for subject in sorted(used_subjects, key=lambda s: s.get_name()):
-            subject_name = subject.get_name()
-            abbr = subject_abbreviations.get(subject_name, subject_name[:3].upper())
-            
-            ttk.Label(legend_frame, text=f"{abbr}: {subject_name}", width=20).grid(
-                row=row, column=col, padx=5, pady=2, sticky="w")
-            
-            col += 1
-            if col >= 3:  # 3 columns in the legend
-                col = 0
-                row += 1
-        
-        # Add faculty assignments frame
-        faculty_frame = ttk.LabelFrame(frame, text="Faculty Assignments")
-        faculty_frame.grid(row=HOURS_PER_DAY+3, column=0, columnspan=len(WORKDAYS)+2, 
-                           padx=10, pady=10, sticky="ew")
-        
-        # Add faculty assignments to the frame
-        row = 0
-        col = 0
-        
-        for subject in sorted(used_subjects, key=lambda s: s.get_name()):
-            faculty = class_obj.faculties.get(subject, None)
-            if faculty:
-                ttk.Label(faculty_frame, text=f"{subject.get_name()}: {faculty.get_name()}", width=25).grid(
-                    row=row, column=col, padx=5, pady=2, sticky="w")
-                
-                col += 1
-                if col >= 2:  # 2 columns for faculty assignments
-                    col = 0
-                    row += 1
-                    
+        tabs[str(frame)] = (frame, class_obj)
+    
+    # Faculty tab: one view, switched between faculty with the selector
+    faculty_tab = ttk.Frame(notebook)
+    notebook.add(faculty_tab, text="Faculty")
+    faculty_by_name = {faculty.get_name(): faculty for faculty in school.faculties}
+    selected_faculty = tk.StringVar(value=school.faculties[0].get_name() if school.faculties else "")
+    selector = ttk.Combobox(faculty_tab, textvariable=selected_faculty, values=list(faculty_by_name),
+                            state="readonly", width=30)
+    selector.pack(anchor="w", padx=5, pady=5)
+    
+    def show_tab(event):
+        name = notebook.select()
+        if name in views:
+            return
+        if name in tabs:
+            frame, class_obj = tabs[name]
+            views[name] = ClassTimetable(frame, class_obj, TIME_SLOTS, break_periods)
+        elif name == str(faculty_tab) and selected_faculty.get():
+            views[name] = FacultyTimetable(faculty_tab, faculty_by_name[selected_faculty.get()],
+                                           TIME_SLOTS, break_periods)
+    
+    def show_faculty(event):
+        view = views.get(str(faculty_tab))
+        if view is not None:
+            view.show(faculty_by_name[selected_faculty.get()])
+    
+    notebook.bind("<<NotebookTabChanged>>", show_tab)
+    selector.bind("<<ComboboxSelected>>", show_faculty)
+    
     # Create button frame with Export and Recreate buttons
     button_frame = ttk.Frame(root)
     button_frame.pack(pady=10)
@@ -845,12 +1219,21 @@ def create_gui(school):
                            command=recreate_timetable)
     recreate_btn.pack(side="left", padx=10)
     
+    # Stops a running Recreate; the shown timetables stay as they are
+    cancel_btn = ttk.Button(button_frame, text="Cancel", command=cancel_solve)
+    cancel_btn.state(["disabled"])
+    cancel_btn.pack(side="left", padx=10)
+    
+    status = tk.StringVar(value="")
+    ttk.Label(button_frame, textvariable=status, width=60).pack(side="left", padx=10)
+    
+    root.protocol("WM_DELETE_WINDOW", close)
     root.mainloop()
 
 def analyze_free_periods(school):
     """Analyze free periods in the timetable and calculate faculty needs"""
     
-    print("\n=== FREE PERIODS ANALYSIS ===\n")
+    logger.info("\n=== FREE PERIODS ANALYSIS ===\n")
     
     # Track overall stats
     total_free_periods = 0
@@ -858,7 +1241,7 @@ def analyze_free_periods(school):
     
     # For each class
     for class_obj in school.classes:
-        print(f"\nClass: {class_obj.get_name()}")
+        logger.info(f"\nClass: {class_obj.get_name()}")
         free_periods = 0
         free_periods_by_day = {day: 0 for day in WORKDAYS}
         
@@ -871,15 +1254,15 @@ def analyze_free_periods(school):
                         free_periods += 1
                         free_periods_by_day[day] += 1
         
-        print(f"  Total free periods: {free_periods}")
-        print("  Free periods by day:")
+        logger.info(f"  Total free periods: {free_periods}")
+        logger.info("  Free periods by day:")
         for day, count in free_periods_by_day.items():
-            print(f"    {day}: {count}")
+            logger.info(f"    {day}: {count}")
         
         total_free_periods += free_periods
         
         # Check subject allocation vs credit requirements
-        print("  Subject allocation analysis:")
+        logger.info("  Subject allocation analysis:")
         
         # Count actual hours per subject
         actual_hours = {}
@@ -899,7 +1282,7 @@ def analyze_free_periods(school):
             
             if required_hours > actual:
                 shortfall = required_hours - actual
-                print(f"    {subject.get_name()}: {actual}/{required_hours} hours (shortfall: {shortfall})")
+                logger.info(f"    {subject.get_name()}: {actual}/{required_hours} hours (shortfall: {shortfall})")
                 
                 # Add to overall shortfall
                 if subject.get_name() not in subject_shortfalls:
@@ -908,18 +1291,17 @@ def analyze_free_periods(school):
                     subject_shortfalls[subject.get_name()] += shortfall
     
     # Calculate additional faculty needs
-    print("\nOverall Statistics:")
-    print(f"Total free periods across all classes: {total_free_periods}")
-    print("Total subject hour shortfalls:")
+    logger.info("\nOverall Statistics:")
+    logger.info(f"Total free periods across all classes: {total_free_periods}")
+    logger.info("Total subject hour shortfalls:")
     for subject, hours in subject_shortfalls.items():
-        print(f"  {subject}: {hours} hours")
+        logger.info(f"  {subject}: {hours} hours")
     
     # Calculate minimum faculty needs based on subject qualifications
     faculty_needs = {}
     for subject_name, hours_needed in subject_shortfalls.items():
         # Find how many faculties can teach this subject
-        qualified_faculty = sum(1 for f in school.faculties if 
-                               any(s.get_name() == subject_name for s in f.get_subjects()))
+        qualified_faculty = len(school.qualified_faculty(subject_name))
 
         # Consider existing qualified faculty when calculating additional needs
         # Check if existing faculty still have capacity for teaching more classes
@@ -937,33 +1319,37 @@ def analyze_free_periods(school):
         faculty_needs[subject_name] = additional_faculty
 
         # Add information about existing qualified faculty to output
-        print(f"  {subject_name}: {hours_needed} hours needed, {qualified_faculty} qualified faculty available")
+        logger.info(f"  {subject_name}: {hours_needed} hours needed, {qualified_faculty} qualified faculty available")
         if qualified_faculty > 0:
-            print(f"    Existing capacity: {existing_capacity} hours")
+            logger.info(f"    Existing capacity: {existing_capacity} hours")
     
-    print("\nAdditional faculty needed to cover shortfalls:")
+    logger.info("\nAdditional faculty needed to cover shortfalls:")
     for subject, count in faculty_needs.items():
         if count > 0:
-            print(f"  {subject}: {count} additional faculty members")
+            logger.info(f"  {subject}: {count} additional faculty members")
     
+    event(logger, "free_period_analysis", "Free period analysis complete",
+          free_periods=total_free_periods, shortfalls=subject_shortfalls,
+          faculty_needs={subject: count for subject, count in faculty_needs.items() if count > 0})
     return total_free_periods, subject_shortfalls, faculty_needs
 
 if __name__ == "__main__":
-    print("Starting timetable generation...")
+    configure()
+    logger.info("Starting timetable generation...")
     # Calculate time slots based on config
     TIME_SLOTS, BREAK_SLOTS = calculate_time_slots()
-    print("School day schedule:")
-    for period, time in sorted(TIME_SLOTS.items()):
-        print(f"Period {period}: {time}")
+    logger.info("School day schedule:")
+    for period, slot_time in sorted(TIME_SLOTS.items()):
+        logger.info(f"Period {period}: {slot_time}")
     
-    school = School(classes, faculties)
+    school = demo_school()
     
     success = schedule_backtrack(school)
     
     if success:
-        print("Successfully created timetables for all classes!")
+        logger.info("Successfully created timetables for all classes!")
         # Run the free period analysis before showing GUI
         free_periods, shortfalls, faculty_needs = analyze_free_periods(school)
         create_gui(school)
     else:
-        print("Failed to create complete timetables. Try adjusting constraints.")
+        logger.warning("Failed to create complete timetables. Try adjusting constraints.")
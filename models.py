@@ -1,21 +1,236 @@
+from array import array
+from config import WORKDAYS, HOURS_PER_DAY, SUBJECT_ABBREVIATIONS
+
+# Sentinel cell codes of a TimetableGrid; codes >= 0 are (subject, faculty) pairs
+FREE_CODE = -1
+BREAK_CODE = -2
+
+# Interned IDs: every distinct name gets one small int per kind, so models
+# compare and hash by integer instead of by name string. The tables belong
+# to one process; a pickled model is interned again where it is unpickled
+SUBJECT_IDS = {}
+FACULTY_IDS = {}
+CLASS_IDS = {}
+
+
+def intern_id(table, name):
+    return table.setdefault(name, len(table))
+
+
+def _rebuild(cls, name):
+    # Unpickling, e.g. in a spawned worker process: the ID is interned in this
+    # process's table before the rest of the state, which may refer back to
+    # the object, is restored
+    obj = cls.__new__(cls)
+    obj.name = name
+    obj.id = intern_id(cls._ids, name)
+    return obj
+
+
+def _reduce(obj):
+    # Pickle a model by name and slot values; the ID is not carried across
+    slots = {slot: getattr(obj, slot) for klass in type(obj).__mro__
+             for slot in getattr(klass, '__slots__', ()) if slot != 'id' and hasattr(obj, slot)}
+    return _rebuild, (type(obj), obj.name), (None, slots)
+
+
 class School:
     def __init__(self, classes, faculties):
         self.classes = classes
         self.faculties = faculties
+        self.qualified = {}   # Subject -> faculties that can teach it
+        self.subject_named = {}  # Subject name -> Subject, for lookups by name
+        self.teaching = {}    # Faculty -> {class: subject} it is assigned to
+        for faculty in faculties:
+            self._index_faculty(faculty)
+        # One integer grid holds every class timetable of the school
+        self.grid = TimetableGrid(WORKDAYS, HOURS_PER_DAY)
+        for class_obj in classes:
+            self.grid.adopt(class_obj)
+        for class_obj in classes:
+            for subject, faculty in class_obj.faculties.items():
+                self.teaching.setdefault(faculty, {})[class_obj] = subject
+
     def get_classes(self):
         return self.classes
     def get_faculties(self):
         return self.faculties
+
+    def _index_faculty(self, faculty):
+        self.teaching.setdefault(faculty, {})
+        for subject in faculty.get_subjects():
+            self.subject_named.setdefault(subject.get_name(), subject)
+            teachers = self.qualified.setdefault(subject, [])
+            if faculty not in teachers:
+                teachers.append(faculty)
+
+    def qualified_faculty(self, subject):
+        # Accepts a Subject or a subject name
+        if isinstance(subject, str):
+            subject = self.subject_named.get(subject)
+        return self.qualified.get(subject, [])
+
+    def can_teach(self, faculty, subject):
+        return faculty in self.qualified_faculty(subject)
+
+    def add_faculty(self, faculty):
+        self.faculties.append(faculty)
+        self._index_faculty(faculty)
+
+    def remove_faculty(self, faculty):
+        # Drops the faculty from the roster, the index and any class it was assigned to
+        self.faculties.remove(faculty)
+        for class_obj in list(self.teaching.pop(faculty, {})):
+            for subject, assigned in list(class_obj.faculties.items()):
+                if assigned is faculty:
+                    del class_obj.faculties[subject]
+        for teachers in self.qualified.values():
+            if faculty in teachers:
+                teachers.remove(faculty)
+
+    def assign(self, class_obj, subject, faculty):
+        self.unassign(class_obj, subject)
+        class_obj.faculties[subject] = faculty
+        self.teaching.setdefault(faculty, {})[class_obj] = subject
+
+    def unassign(self, class_obj, subject):
+        faculty = class_obj.faculties.pop(subject, None)
+        if faculty is not None:
+            self.teaching.get(faculty, {}).pop(class_obj, None)
+        return faculty
+
+    def clear_assignments(self):
+        for class_obj in self.classes:
+            class_obj.faculties = {}
+        self.teaching = {faculty: {} for faculty in self.faculties}
+
+    def classes_of(self, faculty):
+        # Classes this faculty is assigned to, with the subject it teaches there
+        return self.teaching.get(faculty, {})
+
+    def rebuild_occupancy(self):
+        # Recompute faculty occupancy and freshness from the lessons in the timetables
+        for faculty in self.faculties:
+            faculty.reset_occupancy()
+        for class_obj in self.classes:
+            grid = class_obj.grid
+            for day in grid.days:
+                start = grid.offset(class_obj.row, day, 0)
+                for hour in range(grid.periods):
+                    code = grid.cells[start + hour]
+                    if code >= 0:
+                        grid.pairs[code][1].occupy(day, hour)
+
+    def index_faculty_timetables(self):
+        # Fill each faculty's timetable, day -> per period (class, subject) or None,
+        # in one pass over the grid instead of a scan of every class per faculty
+        grid = self.grid
+        indexed = set()
+        for faculty in self.faculties:
+            faculty.timetable = {day: [None] * grid.periods for day in grid.days}
+            indexed.add(faculty)
+        for class_obj in self.classes:
+            for day in grid.days:
+                start = grid.offset(class_obj.row, day, 0)
+                for hour in range(grid.periods):
+                    code = grid.cells[start + hour]
+                    if code >= 0:
+                        subject, faculty = grid.pairs[code]
+                        if faculty not in indexed:
+                            # Teaching here but no longer on the roster
+                            faculty.timetable = {d: [None] * grid.periods for d in grid.days}
+                            indexed.add(faculty)
+                        faculty.timetable[day][hour] = (class_obj, subject)
     
 
 class Faculty:
+    __slots__ = ('id', 'name', 'subjects', 'classes', 'isfree_score', 'timetable',
+                 'occupied', 'hours_taught', 'blocked')
+
+    _ids = FACULTY_IDS
+
     def __init__(self, name, subjects):
+        self.id = intern_id(FACULTY_IDS, name)
         self.name = name
         self.subjects = subjects
         self.classes = []
-        self.isfree_score = {}  # Will store availability scores for each day and hour
-        self.timetable = {}     # Will store the faculty's schedule
+        self.isfree_score = {day: [10] * HOURS_PER_DAY for day in WORKDAYS}  # Availability scores per day and hour
+        self.timetable = {}     # Day -> per period (class, subject) or None; see School.index_faculty_timetables
+        self.occupied = {}      # Per-day occupancy bitmask (bit h set = teaching at hour h)
+        self.hours_taught = {}  # Per-day running count of teaching hours
+        self.blocked = {}       # Per-day bitmask of hours the faculty cannot teach (absences)
+
+    def __eq__(self, other):
+        if not isinstance(other, Faculty):
+            return NotImplemented
+        return self.id == other.id
+
+    def __hash__(self):
+        return self.id
+
+    def __reduce__(self):
+        return _reduce(self)
+
+    def reset_occupancy(self):
+        self.occupied = {}
+        self.hours_taught = {}
+        self.isfree_score = {day: [10] * HOURS_PER_DAY for day in WORKDAYS}  # 10 is max freshness
+
+    def is_occupied(self, day, hour):
+        return ((self.occupied.get(day, 0) | self.blocked.get(day, 0)) >> hour) & 1 == 1
+
+    def block(self, day, hours=None):
+        # Make hours of a day (the whole day if None) unavailable; kept across resets
+        mask = (1 << HOURS_PER_DAY) - 1 if hours is None else sum(1 << h for h in hours)
+        self.blocked[day] = self.blocked.get(day, 0) | mask
+
+    def unblock(self, day=None):
+        if day is None:
+            self.blocked = {}
+        else:
+            self.blocked.pop(day, None)
+
+    def hours_on(self, day):
+        return self.hours_taught.get(day, 0)
+
+    def tire(self, day, hour, sign=1):
+        # Teaching costs 4 freshness points at the hour and 2 at each neighbour;
+        # sign=-1 gives them back
+        scores = self.isfree_score.get(day)
+        if scores is None:
+            scores = self.isfree_score[day] = [10] * HOURS_PER_DAY
+        scores[hour] -= 4 * sign
+        if hour > 0:
+            scores[hour - 1] -= 2 * sign
+        if hour < len(scores) - 1:
+            scores[hour + 1] -= 2 * sign
+
+    # occupy and release are exact inverses, occupancy and freshness alike, so
+    # a search that releases in reverse order of occupying restores the state
+    def occupy(self, day, hour):
+        self.occupied[day] = self.occupied.get(day, 0) | (1 << hour)
+        self.hours_taught[day] = self.hours_taught.get(day, 0) + 1
+        self.tire(day, hour)
+
+    def release(self, day, hour):
+        self.occupied[day] = self.occupied.get(day, 0) & ~(1 << hour)
+        self.hours_taught[day] = self.hours_taught.get(day, 0) - 1
+        self.tire(day, hour, -1)
         
+    def load_summary(self):
+        # Teaching hours per day and in total, classes taught and the freshness
+        # profile, read from the indexed timetable
+        hours = {day: sum(1 for lesson in self.timetable.get(day, ()) if lesson) for day in WORKDAYS}
+        freshness = {day: list(self.isfree_score.get(day, [10] * HOURS_PER_DAY)) for day in WORKDAYS}
+        return {
+            'hours_per_day': hours,
+            'total_hours': sum(hours.values()),
+            'classes': sorted({lesson[0].get_name() for lessons in self.timetable.values()
+                               for lesson in lessons if lesson}),
+            'freshness': freshness,
+            'lowest_freshness': min(min(scores) for scores in freshness.values()),
+        }
+
     def add_class(self, class_name):
         self.classes.append(class_name)
         
@@ -29,11 +244,41 @@ class Faculty:
         return self.subjects
     
 class Class:
+    __slots__ = ('id', 'name', 'subjects', 'faculties', 'grid', 'row')
+
+    _ids = CLASS_IDS
+
     def __init__(self, name, subjects):
+        self.id = intern_id(CLASS_IDS, name)
         self.name = name
         self.subjects = subjects
-        self.timetable = {}
         self.faculties = {}  # Map subjects to faculties
+        # Row of a TimetableGrid; a class has its own one-row grid until a School adopts it
+        self.grid = TimetableGrid(WORKDAYS, HOURS_PER_DAY)
+        self.row = self.grid.add_class()
+
+    def __eq__(self, other):
+        if not isinstance(other, Class):
+            return NotImplemented
+        return self.id == other.id
+
+    def __hash__(self):
+        return self.id
+
+    def __reduce__(self):
+        return _reduce(self)
+
+    @property
+    def timetable(self):
+        # Dict-of-lists view of this class's grid row (day -> slots)
+        return TimetableView(self.grid, self.row)
+
+    @timetable.setter
+    def timetable(self, layout):
+        layout = {day: list(slots) for day, slots in layout.items()}
+        self.grid.clear_class(self.row)
+        for day, slots in layout.items():
+            self.timetable[day] = slots
 
     def get_name(self):
         return self.name
@@ -47,9 +292,25 @@ class Class:
 
 
 class Subject:
+    __slots__ = ('id', 'name', 'credits')
+
+    _ids = SUBJECT_IDS
+
     def __init__(self, name, credits):
+        self.id = intern_id(SUBJECT_IDS, name)
         self.name = name
         self.credits = credits
+
+    def __eq__(self, other):
+        if not isinstance(other, Subject):
+            return NotImplemented
+        return self.id == other.id
+
+    def __hash__(self):
+        return self.id
+
+    def __reduce__(self):
+        return _reduce(self)
     
     def get_name(self):
         return self.name
@@ -57,10 +318,23 @@ class Subject:
     def get_credits(self):
         return self.credits
 
+    def get_abbreviation(self):
+        return SUBJECT_ABBREVIATIONS.get(self.name, self.name[:3].upper())
+
 class Hour:
+    __slots__ = ('subject', 'faculty')
+
     def __init__(self, subject, faculty):
         self.subject = subject
         self.faculty = faculty
+
+    def __eq__(self, other):
+        if not isinstance(other, Hour):
+            return NotImplemented
+        return self.subject.id == other.subject.id and self.faculty.id == other.faculty.id
+
+    def __hash__(self):
+        return hash((self.subject.id, self.faculty.id))
         
     def get_subject(self):
         return self.subject
@@ -75,6 +349,8 @@ class Hour:
         return f"{self.subject.get_name()} - {self.faculty.get_name()}"
 
 class Labs(Subject):
+    __slots__ = ('number_of_lab_slots',)
+
     def __init__(self, name, credits, labslots=2):
         super().__init__(name, credits)
         self.number_of_lab_slots = labslots
@@ -83,3 +359,139 @@ class Labs(Subject):
         return self.number_of_lab_slots
 
 
+
+
+class TimetableGrid:
+    """
+    Timetables of many classes in one flat array of small integer codes,
+    indexed by (class row, day, period). A code >= 0 names an interned
+    (subject, faculty) pair, FREE_CODE an unfilled period and BREAK_CODE a
+    break. Class.timetable reads and writes it through TimetableView.
+    """
+    def __init__(self, days, periods):
+        self.days = list(days)
+        self.day_index = {day: d for d, day in enumerate(self.days)}
+        self.periods = periods
+        self.row_size = len(self.days) * periods
+        self.cells = array('i')
+        self.laid_out = []  # Per row: days present in the dict view
+        self.pairs = []     # Code -> (subject, faculty)
+        self.hours = []     # Code -> shared Hour object for that pair
+        self.codes = {}     # (subject, faculty) -> code
+
+    def add_class(self):
+        self.cells.extend([FREE_CODE] * self.row_size)
+        self.laid_out.append(set())
+        return len(self.laid_out) - 1
+
+    def adopt(self, class_obj):
+        # Move a class's current timetable into a new row of this grid
+        layout = {day: list(slots) for day, slots in class_obj.timetable.items()}
+        class_obj.grid, class_obj.row = self, self.add_class()
+        for day, slots in layout.items():
+            class_obj.timetable[day] = slots
+
+    def clear_class(self, row):
+        start = row * self.row_size
+        self.cells[start:start + self.row_size] = array('i', [FREE_CODE] * self.row_size)
+        self.laid_out[row].clear()
+
+    def offset(self, row, day, hour):
+        return row * self.row_size + self.day_index[day] * self.periods + hour
+
+    def code(self, subject, faculty):
+        key = (subject, faculty)
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.pairs)
+            self.codes[key] = code
+            self.pairs.append(key)
+            self.hours.append(Hour(subject, faculty))
+        return code
+
+    def encode(self, slot):
+        if slot is None:
+            return FREE_CODE
+        if isinstance(slot, str):
+            return BREAK_CODE
+        return self.code(slot.get_subject(), slot.get_faculty())
+
+    def decode(self, code):
+        if code == FREE_CODE:
+            return None
+        if code == BREAK_CODE:
+            return "BREAK"
+        return self.hours[code]
+
+
+class TimetableView:
+    """Dict-like day -> DayView access to one row of a TimetableGrid"""
+    def __init__(self, grid, row):
+        self.grid = grid
+        self.row = row
+
+    def __getitem__(self, day):
+        if day not in self.grid.laid_out[self.row]:
+            raise KeyError(day)
+        return DayView(self.grid, self.grid.offset(self.row, day, 0))
+
+    def __setitem__(self, day, slots):
+        start = self.grid.offset(self.row, day, 0)
+        codes = [self.grid.encode(slot) for slot in slots]
+        if len(codes) > self.grid.periods:
+            raise ValueError(f"{len(codes)} slots for a {self.grid.periods}-period day")
+        codes += [FREE_CODE] * (self.grid.periods - len(codes))
+        self.grid.cells[start:start + len(codes)] = array('i', codes)
+        self.grid.laid_out[self.row].add(day)
+
+    def __contains__(self, day):
+        return day in self.grid.laid_out[self.row]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.grid.laid_out[self.row])
+
+    def keys(self):
+        laid_out = self.grid.laid_out[self.row]
+        return [day for day in self.grid.days if day in laid_out]
+
+    def items(self):
+        return [(day, self[day]) for day in self.keys()]
+
+    def values(self):
+        return [self[day] for day in self.keys()]
+
+    def get(self, day, default=None):
+        return self[day] if day in self else default
+
+
+class DayView:
+    """List-like access to one day of a grid row; slots are None, "BREAK" or Hour"""
+    def __init__(self, grid, start):
+        self.grid = grid
+        self.start = start
+
+    def __len__(self):
+        return self.grid.periods
+
+    def __getitem__(self, hour):
+        if isinstance(hour, slice):
+            return [self[h] for h in range(*hour.indices(len(self)))]
+        if hour < 0:
+            hour += len(self)
+        if not 0 <= hour < len(self):
+            raise IndexError(hour)
+        return self.grid.decode(self.grid.cells[self.start + hour])
+
+    def __setitem__(self, hour, slot):
+        if hour < 0:
+            hour += len(self)
+        if not 0 <= hour < len(self):
+            raise IndexError(hour)
+        self.grid.cells[self.start + hour] = self.grid.encode(slot)
+
+    def __iter__(self):
+        decode = self.grid.decode
+        return (decode(code) for code in self.grid.cells[self.start:self.start + len(self)])
@@ -0,0 +1,330 @@
+"""
+Local-search improvement of solved timetables.
+
+Starts from the timetables a solver produced and runs simulated annealing
+with a short tabu list over two neighbourhoods inside one class: swapping
+two periods (a lesson with a lesson, or a lesson with a free period, which
+moves it) and filling a free period with a lesson a subject is still short
+of. Every move keeps the hard constraints the solvers enforce (faculty
+clash, daily maximum, freshness) and is scored by the change it makes to
+the affected days and hours only.
+
+Lab blocks and breaks stay where they are.
+"""
+import logging
+import math
+import random
+from models import Labs, FREE_CODE
+from scheduler import SearchBudget, required_hours
+from logs import event, get_logger
+from config import (
+    WORKDAYS,
+    HOURS_PER_DAY,
+    MAX_HOURS_PER_DAY,
+    MIN_FRESHNESS_SCORE,
+    OPTIMIZER_SETTINGS
+)
+
+logger = get_logger("optimizer")
+
+
+class TimetableOptimizer:
+    """Simulated annealing over the lessons of every class in a school"""
+
+    def __init__(self, school, budget=None, rng=None, cancel=None):
+        self.school = school
+        self.budget = budget if budget is not None else SearchBudget(
+            max_nodes=OPTIMIZER_SETTINGS['max_moves'], time_limit=OPTIMIZER_SETTINGS['time_limit'],
+            cancel=cancel)
+        self.rng = rng if rng is not None else random.Random()
+        weights = OPTIMIZER_SETTINGS['weights']
+        self.w_gap = weights['gap']
+        self.w_repeat = weights['same_day']
+        self.w_pattern = weights['same_hour']
+        self.w_short = weights['shortfall']
+        self.moves = 0
+        self.accepted = 0
+        self._build()
+
+    def _build(self):
+        """Index the grid and count lessons per (subject, day) and (subject, hour)"""
+        self.classes = list(self.school.classes)
+        self.start = []      # Per class: day index -> offset of the day in its grid
+        self.movable = []    # Per class: (day index, hour) cells that may change
+        self.day_count = []  # Per class: (subject, day index) -> single-period lessons
+        self.hour_count = []  # Per class: (subject, hour) -> single-period lessons
+        self.short = []      # Per class: subject -> hours still missing
+        self.fill_code = []  # Per class: subject -> grid code of its (subject, faculty) pair
+
+        for class_obj in self.classes:
+            grid = class_obj.grid
+            start = [grid.offset(class_obj.row, day, 0) for day in WORKDAYS]
+            movable = []
+            day_count = {}
+            hour_count = {}
+            placed = {}
+            for d in range(len(WORKDAYS)):
+                for hour in range(HOURS_PER_DAY):
+                    code = grid.cells[start[d] + hour]
+                    if code == FREE_CODE:
+                        movable.append((d, hour))
+                    elif code >= 0:
+                        subject = grid.pairs[code][0]
+                        placed[subject] = placed.get(subject, 0) + 1
+                        if not isinstance(subject, Labs):
+                            movable.append((d, hour))
+                            day_count[(subject, d)] = day_count.get((subject, d), 0) + 1
+                            hour_count[(subject, hour)] = hour_count.get((subject, hour), 0) + 1
+            short = {}
+            for subject in class_obj.faculties:
+                missing = required_hours(subject) - placed.get(subject, 0)
+                if missing > 0 and not isinstance(subject, Labs):
+                    short[subject] = missing
+            self.start.append(start)
+            self.movable.append(movable)
+            self.day_count.append(day_count)
+            self.hour_count.append(hour_count)
+            self.short.append(short)
+            self.fill_code.append({subject: grid.code(subject, faculty)
+                                   for subject, faculty in class_obj.faculties.items()})
+
+    # --- Cost ---
+
+    def _gaps(self, ci, d):
+        """Free periods between the first and last lesson of a day"""
+        cells = self.classes[ci].grid.cells
+        start = self.start[ci][d]
+        gaps = 0
+        pending = 0
+        seen_lesson = False
+        for hour in range(HOURS_PER_DAY):
+            code = cells[start + hour]
+            if code >= 0:
+                if seen_lesson:
+                    gaps += pending
+                pending = 0
+                seen_lesson = True
+            elif code == FREE_CODE:
+                pending += 1
+        return gaps
+
+    def _local_cost(self, ci, subjects, days, hours):
+        """Cost terms that a move touching these subjects, days and hours can change"""
+        cost = self.w_gap * sum(self._gaps(ci, d) for d in days)
+        day_count = self.day_count[ci]
+        hour_count = self.hour_count[ci]
+        for subject in subjects:
+            for d in days:
+                cost += self.w_repeat * max(day_count.get((subject, d), 0) - 1, 0)
+            for hour in hours:
+                cost += self.w_pattern * max(hour_count.get((subject, hour), 0) - 1, 0)
+        return cost
+
+    def class_cost(self, ci):
+        subjects = list(self.classes[ci].faculties)
+        return (self._local_cost(ci, subjects, range(len(WORKDAYS)), range(HOURS_PER_DAY))
+                + self.w_short * sum(self.short[ci].values()))
+
+    def cost(self):
+        return sum(self.class_cost(ci) for ci in range(len(self.classes)))
+
+    # --- Moves ---
+
+    def _available(self, faculty, day, hour):
+        if faculty.is_occupied(day, hour):
+            return False
+        if faculty.hours_on(day) >= MAX_HOURS_PER_DAY:
+            return False
+        return faculty.isfree_score[day][hour] >= MIN_FRESHNESS_SCORE
+
+    def _count(self, ci, subject, d, hour, sign):
+        key = (subject, d)
+        self.day_count[ci][key] = self.day_count[ci].get(key, 0) + sign
+        key = (subject, hour)
+        self.hour_count[ci][key] = self.hour_count[ci].get(key, 0) + sign
+
+    def _set(self, ci, d, hour, code):
+        """Write a cell, keeping faculty occupancy and lesson counts in step"""
+        grid = self.classes[ci].grid
+        day = WORKDAYS[d]
+        old = grid.cells[self.start[ci][d] + hour]
+        if old >= 0:
+            subject, faculty = grid.pairs[old]
+            faculty.release(day, hour)
+            self._count(ci, subject, d, hour, -1)
+        grid.cells[self.start[ci][d] + hour] = code
+        if code >= 0:
+            subject, faculty = grid.pairs[code]
+            faculty.occupy(day, hour)
+            self._count(ci, subject, d, hour, 1)
+
+    def _exchange(self, ci, a, b):
+        """Swap the contents of cells a and b of class ci without any checks"""
+        cells = self.classes[ci].grid.cells
+        code_a = cells[self.start[ci][a[0]] + a[1]]
+        code_b = cells[self.start[ci][b[0]] + b[1]]
+        self._set(ci, a[0], a[1], FREE_CODE)
+        self._set(ci, b[0], b[1], code_a)
+        self._set(ci, a[0], a[1], code_b)
+
+    def _swap(self, ci, a, b):
+        """Swap cells a and b of class ci if both faculty can take their new period"""
+        grid = self.classes[ci].grid
+        code_a = grid.cells[self.start[ci][a[0]] + a[1]]
+        code_b = grid.cells[self.start[ci][b[0]] + b[1]]
+        self._set(ci, a[0], a[1], FREE_CODE)
+        self._set(ci, b[0], b[1], FREE_CODE)
+        # Placing one lesson can tire the other faculty's neighbouring hour, so check in order
+        if code_a < 0 or self._available(grid.pairs[code_a][1], WORKDAYS[b[0]], b[1]):
+            self._set(ci, b[0], b[1], code_a)
+            if code_b < 0 or self._available(grid.pairs[code_b][1], WORKDAYS[a[0]], a[1]):
+                self._set(ci, a[0], a[1], code_b)
+                return True
+            self._set(ci, b[0], b[1], FREE_CODE)
+        self._set(ci, b[0], b[1], code_b)
+        self._set(ci, a[0], a[1], code_a)
+        return False
+
+    def _propose(self):
+        """Pick a random move; returns (class index, cell a, cell b or subject to fill) or None"""
+        ci = self.rng.randrange(len(self.classes))
+        movable = self.movable[ci]
+        if len(movable) < 2:
+            return None
+        a = movable[self.rng.randrange(len(movable))]
+        grid = self.classes[ci].grid
+        if self.short[ci] and grid.cells[self.start[ci][a[0]] + a[1]] == FREE_CODE \
+                and self.rng.random() < 0.5:
+            return ci, a, self.rng.choice(list(self.short[ci]))
+        b = movable[self.rng.randrange(len(movable))]
+        code_a = grid.cells[self.start[ci][a[0]] + a[1]]
+        code_b = grid.cells[self.start[ci][b[0]] + b[1]]
+        if code_a == code_b:
+            return None  # Same lesson or both free: nothing changes
+        return ci, a, b
+
+    def _try(self, ci, a, b, temperature):
+        """Apply one move if allowed and accepted; returns the cost change, or None"""
+        grid = self.classes[ci].grid
+        if not isinstance(b, tuple):
+            # Fill a free period with a lesson the subject is short of
+            subject = b
+            faculty = self.classes[ci].faculties[subject]
+            if not self._available(faculty, WORKDAYS[a[0]], a[1]):
+                return None
+            before = self._local_cost(ci, [subject], {a[0]}, {a[1]})
+            self._set(ci, a[0], a[1], self.fill_code[ci][subject])
+            delta = self._local_cost(ci, [subject], {a[0]}, {a[1]}) - before - self.w_short
+            if self._accept(delta, temperature):
+                self.short[ci][subject] -= 1
+                if not self.short[ci][subject]:
+                    del self.short[ci][subject]
+                return delta
+            self._set(ci, a[0], a[1], FREE_CODE)
+            return None
+
+        subjects = {grid.pairs[code][0]
+                    for code in (grid.cells[self.start[ci][a[0]] + a[1]],
+                                 grid.cells[self.start[ci][b[0]] + b[1]]) if code >= 0}
+        days = {a[0], b[0]}
+        hours = {a[1], b[1]}
+        before = self._local_cost(ci, subjects, days, hours)
+        if not self._swap(ci, a, b):
+            return None
+        delta = self._local_cost(ci, subjects, days, hours) - before
+        if self._accept(delta, temperature):
+            return delta
+        self._exchange(ci, a, b)
+        return None
+
+    def _accept(self, delta, temperature):
+        if delta <= 0:
+            return True
+        return temperature > 0 and self.rng.random() < math.exp(-delta / temperature)
+
+    def _snapshot(self):
+        return [class_obj.grid.cells[start[0]:start[0] + len(WORKDAYS) * HOURS_PER_DAY]
+                for class_obj, start in zip(self.classes, self.start)]
+
+    def _restore(self, snapshot):
+        """Put back a snapshot and rebuild faculty state and counters from the grid"""
+        for class_obj, start, cells in zip(self.classes, self.start, snapshot):
+            class_obj.grid.cells[start[0]:start[0] + len(cells)] = cells
+        self.school.rebuild_occupancy()
+        self._build()
+
+    def optimize(self):
+        """
+        Improve the timetables in place until the budget runs out or the cost
+        reaches zero, leaving the best timetables seen. Returns (start cost, final cost).
+        """
+        start_cost = current = best_cost = self.cost()
+        best = None  # Snapshot of the best state once the search has left it
+        tabu = {}    # (class index, cell) -> move number until which it may not change
+        tenure = OPTIMIZER_SETTINGS['tabu_tenure']
+        t_start = OPTIMIZER_SETTINGS['start_temperature']
+        t_end = OPTIMIZER_SETTINGS['end_temperature']
+        max_moves = self.budget.max_nodes
+        temperature = t_start
+        reported = start_cost
+
+        while current > 0 and self.budget.tick():
+            self.moves += 1
+            # Cool down geometrically with the share of moves used; tied to moves
+            # rather than time so that a seeded run is reproducible
+            if not self.moves & 0xFF:
+                temperature = t_start * (t_end / t_start) ** min(self.moves / max_moves, 1.0)
+                if best_cost < reported:
+                    reported = best_cost
+                    event(logger, "optimizer_progress", f"  Best cost {best_cost} after {self.moves} moves",
+                          logging.DEBUG, best_cost=best_cost, moves=self.moves)
+            move = self._propose()
+            if move is None:
+                continue
+            ci, a, b = move
+            cells = [(ci, a)] + ([(ci, b)] if isinstance(b, tuple) else [])
+            is_tabu = any(tabu.get(cell, 0) > self.moves for cell in cells)
+            # A tabu move is only allowed if it reaches a new best (aspiration)
+            delta = self._try(ci, a, b, 0 if is_tabu else temperature)
+            if delta is None:
+                continue
+            if is_tabu and current + delta >= best_cost:
+                self._undo(ci, a, b)
+                continue
+            if current == best_cost and delta > 0:
+                # Leaving the best state: keep a copy to come back to
+                self._undo(ci, a, b)
+                best = self._snapshot()
+                self._redo(ci, a, b)
+            self.accepted += 1
+            current += delta
+            for cell in cells:
+                tabu[cell] = self.moves + tenure
+            if current < best_cost:
+                best_cost = current
+                best = None
+
+        if best is not None and current > best_cost:
+            self._restore(best)
+            current = best_cost
+        return start_cost, current
+
+    def _undo(self, ci, a, b):
+        """Take back a move applied by _try"""
+        if isinstance(b, tuple):
+            self._exchange(ci, a, b)
+        else:
+            self._set(ci, a[0], a[1], FREE_CODE)
+            self.short[ci][b] = self.short[ci].get(b, 0) + 1
+
+    def _redo(self, ci, a, b):
+        if isinstance(b, tuple):
+            self._exchange(ci, a, b)
+        else:
+            self._set(ci, a[0], a[1], self.fill_code[ci][b])
+            self.short[ci][b] -= 1
+            if not self.short[ci][b]:
+                del self.short[ci][b]
+
+    def stats(self):
+        return {'moves': self.moves, 'accepted': self.accepted}
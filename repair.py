@@ -0,0 +1,203 @@
+"""
+Incremental repair of solved timetables.
+
+Handles a change to an already solved school without starting over: a
+faculty absent on a day, a period a class can no longer use, or a subject
+added to a class. Only the lessons the change invalidates are taken out,
+and the constraint solver places them again around everything else, which
+stays fixed. If that is not enough, the freed area is widened step by step:
+the affected classes' lessons on the affected days, then the affected
+classes entirely, then every class sharing faculty with them.
+"""
+import random
+from models import Labs, FREE_CODE, BREAK_CODE
+from scheduler import ConstraintSolver, SearchBudget
+from logs import event, get_logger
+from config import BACKTRACK_SETTINGS
+
+logger = get_logger("repair")
+
+
+def lesson_cells(class_obj, day, hour):
+    """Cells of the lesson at (day, hour): the whole block for a lab, else just that cell"""
+    grid = class_obj.grid
+    start = grid.offset(class_obj.row, day, 0)
+    code = grid.cells[start + hour]
+    if code < 0:
+        return set()
+    if not isinstance(grid.pairs[code][0], Labs):
+        return {(class_obj, day, hour)}
+    # A class has at most one session of a lab per day, so the block is every matching cell
+    return {(class_obj, day, h) for h in range(grid.periods) if grid.cells[start + h] == code}
+
+
+def lessons_of(class_obj, days=None):
+    """Cells holding a lesson in a class timetable, optionally only on some days"""
+    grid = class_obj.grid
+    cells = set()
+    for day in grid.days if days is None else days:
+        start = grid.offset(class_obj.row, day, 0)
+        for hour in range(grid.periods):
+            if grid.cells[start + hour] >= 0:
+                cells.add((class_obj, day, hour))
+    return cells
+
+
+def free_lessons(cells):
+    """Take the lessons in these cells out of the timetables"""
+    for class_obj, day, hour in cells:
+        grid = class_obj.grid
+        offset = grid.offset(class_obj.row, day, hour)
+        code = grid.cells[offset]
+        if code >= 0:
+            grid.pairs[code][1].release(day, hour)
+            grid.cells[offset] = FREE_CODE
+
+
+def snapshot(school):
+    """Copy of every class's grid row"""
+    return {class_obj: class_obj.grid.cells[class_obj.row * class_obj.grid.row_size:
+                                            (class_obj.row + 1) * class_obj.grid.row_size]
+            for class_obj in school.classes}
+
+
+def restore(school, saved):
+    """Put back a snapshot and recompute faculty state from it"""
+    for class_obj, cells in saved.items():
+        start = class_obj.row * class_obj.grid.row_size
+        class_obj.grid.cells[start:start + len(cells)] = cells
+    school.rebuild_occupancy()
+
+
+def moved_lessons(school, before):
+    """Lessons that are no longer in the period they had in `before`"""
+    moved = 0
+    for class_obj, cells in before.items():
+        start = class_obj.row * class_obj.grid.row_size
+        for i, code in enumerate(cells):
+            if code >= 0 and class_obj.grid.cells[start + i] != code:
+                moved += 1
+    return moved
+
+
+def repair(school, changed, classes=(), before=None, rng=None, metrics=None):
+    """
+    Re-place the lessons in `changed` (a set of (class, day, hour) cells)
+    while keeping the rest of the school fixed, widening the freed area
+    until the solver succeeds. `classes` lists classes that need solving even
+    without freed cells, e.g. one that gained a subject. `before` is the
+    timetable state to count moved lessons against (default: now). The
+    searches of every step are added to `metrics` (a SolverMetrics) if given.
+    Returns (success, lessons moved). On failure the timetables are left
+    as they were when repair was called.
+    """
+    if rng is None:
+        rng = random.Random()
+    saved = snapshot(school)
+    if before is None:
+        before = saved
+
+    affected = {class_obj for class_obj, _, _ in changed} | set(classes)
+    days = {day for _, day, _ in changed}
+    neighbours = set(affected)
+    for class_obj in affected:
+        for faculty in class_obj.faculties.values():
+            neighbours |= set(school.classes_of(faculty))
+
+    # Each step frees a superset of the previous one
+    steps = [set(changed)]
+    steps.append(steps[-1] | {cell for c in affected for cell in lessons_of(c, days)})
+    steps.append(steps[-1] | {cell for c in affected for cell in lessons_of(c)})
+    steps.append(steps[-1] | {cell for c in neighbours for cell in lessons_of(c)})
+
+    tried = None
+    for step, cells in enumerate(steps):
+        if cells == tried:
+            continue
+        tried = cells
+        free_lessons(cells)
+        solve_classes = [c for c in school.classes if c in affected or any(cell[0] is c for cell in cells)]
+        budget = SearchBudget(max_nodes=BACKTRACK_SETTINGS['repair_max_nodes'], metrics=metrics)
+        solver = ConstraintSolver(school, solve_classes, budget, rng)
+        solved = solver.solve()
+        budget.metrics.add_search(solver.nodes, solver.backtracks, solver.max_depth)
+        if solved:
+            school.index_faculty_timetables()
+            moved = moved_lessons(school, before)
+            event(logger, "repaired",
+                  f"Repaired at step {step} ({len(cells)} lessons freed, {solver.nodes} nodes): "
+                  f"{moved} lessons moved",
+                  step=step, freed=len(cells), nodes=solver.nodes, moved=moved)
+            return True, moved
+        restore(school, saved)
+
+    logger.warning("Repair failed; timetables left unchanged")
+    return False, 0
+
+
+def repair_faculty_absence(school, faculty, day, hours=None, rng=None):
+    """
+    The faculty cannot teach on `day` (or only at the given 0-indexed hours).
+    Its lessons there are moved; the absence stays in force until
+    faculty.unblock(day). If no repair is found nothing changes.
+    """
+    before = snapshot(school)
+    changed = set()
+    for class_obj in school.classes_of(faculty):
+        grid = class_obj.grid
+        start = grid.offset(class_obj.row, day, 0)
+        for hour in range(grid.periods):
+            code = grid.cells[start + hour]
+            if code >= 0 and grid.pairs[code][1] is faculty and (hours is None or hour in hours):
+                changed |= lesson_cells(class_obj, day, hour)
+    previous = faculty.blocked.get(day)
+    free_lessons(changed)
+    faculty.block(day, hours)
+    success, moved = repair(school, changed, before=before, rng=rng)
+    if not success:
+        # Leave the school as it was, absence included
+        if previous is None:
+            faculty.unblock(day)
+        else:
+            faculty.blocked[day] = previous
+        restore(school, before)
+    return success, moved
+
+
+def repair_blocked_period(school, class_obj, day, hour, rng=None):
+    """
+    The class can no longer use (day, hour); the period is marked like a
+    break and any lesson in it is moved.
+    """
+    before = snapshot(school)
+    changed = lesson_cells(class_obj, day, hour)
+    free_lessons(changed)
+    class_obj.grid.cells[class_obj.grid.offset(class_obj.row, day, hour)] = BREAK_CODE
+    changed.discard((class_obj, day, hour))
+    success, moved = repair(school, changed, classes=[class_obj], before=before, rng=rng)
+    if not success:
+        restore(school, before)
+    return success, moved
+
+
+def repair_added_subject(school, class_obj, subject, faculty=None, rng=None):
+    """
+    Add a subject to a class and fit its hours in. Without an explicit
+    faculty, the least-loaded qualified faculty not yet teaching the class
+    is assigned.
+    """
+    if faculty is None:
+        assigned = set(class_obj.faculties.values())
+        candidates = [f for f in school.qualified_faculty(subject) if f not in assigned]
+        if not candidates:
+            logger.warning(f"No qualified faculty free to teach {subject.get_name()} in {class_obj.get_name()}")
+            return False, 0
+        faculty = min(candidates, key=lambda f: sum(f.hours_taught.values()))
+
+    class_obj.subjects.append(subject)
+    school.assign(class_obj, subject, faculty)
+    success, moved = repair(school, set(), classes=[class_obj], rng=rng)
+    if not success:
+        school.unassign(class_obj, subject)
+        class_obj.subjects.remove(subject)
+    return success, moved
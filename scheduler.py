@@ -0,0 +1,726 @@
+"""
+Constraint-propagation timetable solver.
+
+Solves the same School/Class/Faculty model as the slot-order backtracking in
+main.py, but keeps a candidate domain for every open period, forward checks
+after each placement, branches on the most constrained period first (MRV)
+and tries the least constraining subject first (LCV). Lab sessions are
+also matched to days, since labs share the few two-period windows of a
+day, and runs that dig too deep restart with fresh tie-breaks.
+
+The solver only fills free cells of the class timetable grid. Breaks and
+any lesson already present are treated as fixed, so the caller lays out the
+timetable before solving.
+"""
+import contextlib
+import json
+import random
+import time
+from models import Labs, FREE_CODE
+from config import (
+    HOURS_PER_DAY,
+    WORKDAYS,
+    MAX_HOURS_PER_DAY,
+    MIN_FRESHNESS_SCORE,
+    LAB_CONSTRAINTS,
+    BACKTRACK_SETTINGS
+)
+
+FREE = -1  # Value of a period deliberately left free
+
+
+def required_hours(subject):
+    """Weekly hours a subject must be scheduled for in one class"""
+    if isinstance(subject, Labs):
+        # Labs are placed in whole blocks of consecutive slots
+        block = subject.get_labslots()
+        sessions = min(subject.get_credits() // block, LAB_CONSTRAINTS['lab_frequency'])
+        return sessions * block
+    return subject.get_credits()
+
+
+class SearchBudget:
+    """
+    Node counter and wall-clock deadline shared by every search in one solve.
+    Searches call tick() once per node and stop as soon as it returns False,
+    which also happens once the optional cancel event is set.
+    """
+
+    def __init__(self, max_nodes=None, time_limit=None, cancel=None, metrics=None):
+        if max_nodes is None:
+            max_nodes = BACKTRACK_SETTINGS['max_iterations']
+        if time_limit is None:
+            time_limit = BACKTRACK_SETTINGS['time_limit']
+        self.max_nodes = max_nodes
+        self.deadline = time.monotonic() + time_limit if time_limit else None
+        self.cancel = cancel  # Optional event-like object; set() stops the search
+        self.nodes = 0
+        self.exhausted = False
+        # Searches sharing the budget also share one metrics record
+        self.metrics = metrics if metrics is not None else SolverMetrics()
+
+    def tick(self):
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            self.exhausted = True
+        # Reading the clock on every node is measurable; every 256th is enough
+        elif not self.nodes & 0xFF:
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                self.exhausted = True
+            elif self.cancel is not None and self.cancel.is_set():
+                self.exhausted = True
+        return not self.exhausted
+
+
+class SolverMetrics:
+    """
+    What one solve spent its effort on: nodes, backtracks and deepest stack
+    per search, wall time per stage and per class, and how often each
+    constraint turned a candidate down. Rejections are counted where a
+    search tests a candidate (make_timetable) or prunes a domain
+    (ConstraintSolver), so the two engines' counts are not comparable.
+    """
+    REJECTIONS = ('faculty_clash', 'freshness', 'daily_max', 'labs_per_day',
+                  'lab_frequency', 'consecutive_slots')
+
+    def __init__(self):
+        self.nodes = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.stages = {}      # Stage name -> seconds
+        self.classes = {}     # Class name -> {seconds, nodes, backtracks, max_depth, success}
+        self.rejections = dict.fromkeys(self.REJECTIONS, 0)
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        """Add the wall time of a block to a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - start
+
+    def add_search(self, nodes, backtracks, max_depth):
+        self.nodes += nodes
+        self.backtracks += backtracks
+        self.max_depth = max(self.max_depth, max_depth)
+
+    def add_class(self, name, seconds, nodes, backtracks, max_depth, success):
+        self.add_search(nodes, backtracks, max_depth)
+        self.classes[name] = {'seconds': round(seconds, 6), 'nodes': nodes, 'backtracks': backtracks,
+                              'max_depth': max_depth, 'success': bool(success)}
+
+    def merge(self, data):
+        """Add the counts of another solve's to_dict() output"""
+        self.add_search(data['nodes'], data['backtracks'], data['max_depth'])
+        for stage, seconds in data['stages'].items():
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.classes.update(data['classes'])
+        for reason, count in data['rejections'].items():
+            self.rejections[reason] = self.rejections.get(reason, 0) + count
+
+    def to_dict(self):
+        return {
+            'nodes': self.nodes,
+            'backtracks': self.backtracks,
+            'max_depth': self.max_depth,
+            'stages': {stage: round(seconds, 6) for stage, seconds in self.stages.items()},
+            'classes': self.classes,
+            'rejections': dict(self.rejections),
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            f.write(self.to_json())
+
+
+class SolveResult:
+    """
+    Outcome of a solve: true when every class got a complete timetable.
+    source says where it came from ('search', 'parallel', 'cache',
+    'warm_start' or 'infeasible').
+    """
+
+    def __init__(self, success, metrics=None, source='search'):
+        self.success = bool(success)
+        self.metrics = metrics if metrics is not None else SolverMetrics()
+        self.source = source
+
+    def __bool__(self):
+        return self.success
+
+    def __repr__(self):
+        return f"SolveResult(success={self.success}, source={self.source!r}, nodes={self.metrics.nodes})"
+
+    def to_dict(self):
+        return {'success': self.success, 'source': self.source, 'metrics': self.metrics.to_dict()}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent)
+
+
+class DistributionQueue:
+    """
+    Subjects bucketed by distribution score for every (day, hour) slot, so the
+    slot-order search reads candidates best first without sorting. A subject
+    scores 3 per lesson it already has that day, 4 per lesson it has at that
+    hour across the week, plus a 0/1 jitter drawn once per solve (lower is
+    better). Adding or removing a lesson only moves the touched subject's
+    entries between buckets.
+    """
+    DAY_WEIGHT = 3
+    HOUR_WEIGHT = 4
+
+    def __init__(self, subjects, days, periods, rng):
+        self.subjects = list(subjects)
+        self.index = {subject: si for si, subject in enumerate(self.subjects)}
+        self.day_index = {day: d for d, day in enumerate(days)}
+        self.periods = periods
+        # A subject has at most one lesson per period, which bounds every score
+        top = self.DAY_WEIGHT * periods + self.HOUR_WEIGHT * len(self.day_index) + 1
+        # Per slot: (scores by subject index, buckets[score] -> {subject index: None}),
+        # grouped by day and by hour for the two kinds of update
+        self.by_day = []
+        self.by_hour = [[] for _ in range(periods)]
+        for _ in self.day_index:
+            slots = []
+            for hour in range(periods):
+                scores = [rng.randint(0, 1) for _ in self.subjects]
+                buckets = [{} for _ in range(top + 1)]
+                for si, score in enumerate(scores):
+                    buckets[score][si] = None
+                slots.append((scores, buckets))
+                self.by_hour[hour].append((scores, buckets))
+            self.by_day.append(slots)
+
+    def add(self, subject, day, hour, sign=1):
+        """Record one lesson of subject at (day, hour); sign=-1 removes it"""
+        si = self.index[subject]
+        # Every hour of that day gains the day penalty...
+        delta = self.DAY_WEIGHT * sign
+        for scores, buckets in self.by_day[self.day_index[day]]:
+            old = scores[si]
+            scores[si] = old + delta
+            del buckets[old][si]
+            buckets[old + delta][si] = None
+        # ...and that hour on every day gains the hour penalty
+        delta = self.HOUR_WEIGHT * sign
+        for scores, buckets in self.by_hour[hour]:
+            old = scores[si]
+            scores[si] = old + delta
+            del buckets[old][si]
+            buckets[old + delta][si] = None
+
+    def remove(self, subject, day, hour):
+        self.add(subject, day, hour, -1)
+
+    def ordered(self, day, hour):
+        """Subjects for (day, hour), lowest score first"""
+        subjects = self.subjects
+        buckets = self.by_day[self.day_index[day]][hour][1]
+        return [subjects[si] for bucket in buckets if bucket for si in bucket]
+
+
+class ConstraintSolver:
+    """Forward-checking solver over the open periods of one or more classes"""
+
+    def __init__(self, school, classes=None, budget=None, rng=None):
+        self.school = school
+        self.classes = list(classes) if classes is not None else list(school.classes)
+        self.budget = budget if budget is not None else SearchBudget()
+        self.rng = rng if rng is not None else random.Random()
+        self.nodes = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.restarts = 0
+        self.rejections = self.budget.metrics.rejections
+        self.trail = []
+        self.failed = False
+        self._build()
+
+    def _build(self):
+        """Collect per-class requirements, open cells and initial domains"""
+        self.subjects = []      # Per class: subjects in a fixed order
+        self.faculty_of = []    # Per class: assigned faculty per subject index
+        self.block = []         # Per class: slots needed per placement (labs > 1)
+        self.remaining = []     # Per class: hours still to place per subject
+        self.lab_sessions = []  # Per class: lab blocks placed per subject
+        self.labs_on_day = []   # Per class: number of labs per day
+        self.day_count = []     # Per class: per subject, lessons per day
+        self.free_allowed = []  # Per class: how many open cells may stay free
+        self.rank = []          # Per class: random tie-break rank per subject
+        self.faculty_users = {}  # Faculty -> [(class index, subject index)]
+
+        self.cell_class = []
+        self.cell_day = []
+        self.cell_hour = []
+        self.cell_at = {}          # (class index, day, hour) -> cell id
+        self.day_start = []        # Per class: day -> offset of the day in the timetable grid
+        self.code_of = []          # Per class: grid code of each subject's (subject, faculty) pair
+        self.class_cells = []      # Per class: list of cell ids
+        self.class_day_cells = {}  # (class index, day) -> list of cell ids
+
+        for ci, class_obj in enumerate(self.classes):
+            subjects = list(class_obj.faculties.keys())
+            self.subjects.append(subjects)
+            self.faculty_of.append([class_obj.faculties[s] for s in subjects])
+            self.block.append([s.get_labslots() if isinstance(s, Labs) else 1 for s in subjects])
+            remaining = [required_hours(s) for s in subjects]
+            lab_sessions = [0] * len(subjects)
+            labs_on_day = {day: 0 for day in WORKDAYS}
+            day_count = [{day: 0 for day in WORKDAYS} for _ in subjects]
+            index_of = {s: si for si, s in enumerate(subjects)}
+
+            rank = list(range(len(subjects)))
+            if BACKTRACK_SETTINGS['randomize_order']:
+                self.rng.shuffle(rank)
+            self.rank.append(rank)
+
+            for si, faculty in enumerate(self.faculty_of[ci]):
+                self.faculty_users.setdefault(faculty, []).append((ci, si))
+
+            grid = class_obj.grid
+            day_start = {day: grid.offset(class_obj.row, day, 0) for day in WORKDAYS}
+            self.day_start.append(day_start)
+            self.code_of.append([grid.code(s, f) for s, f in zip(subjects, self.faculty_of[ci])])
+
+            cells = []
+            for day in WORKDAYS:
+                day_cells = []
+                labs_today = set()
+                for hour in range(HOURS_PER_DAY):
+                    code = grid.cells[day_start[day] + hour]
+                    if code == FREE_CODE:
+                        cid = len(self.cell_class)
+                        self.cell_class.append(ci)
+                        self.cell_day.append(day)
+                        self.cell_hour.append(hour)
+                        self.cell_at[(ci, day, hour)] = cid
+                        day_cells.append(cid)
+                    elif code >= 0 and grid.pairs[code][0] in index_of:
+                        # Fixed lesson counts towards the subject's hours
+                        si = index_of[grid.pairs[code][0]]
+                        remaining[si] -= 1
+                        day_count[si][day] += 1
+                        if self.block[ci][si] > 1:
+                            labs_today.add(si)
+                for si in labs_today:
+                    labs_on_day[day] += 1
+                    lab_sessions[si] += 1
+                self.class_day_cells[(ci, day)] = day_cells
+                cells.extend(day_cells)
+
+            self.remaining.append(remaining)
+            self.lab_sessions.append(lab_sessions)
+            self.labs_on_day.append(labs_on_day)
+            self.day_count.append(day_count)
+            self.class_cells.append(cells)
+            self.free_allowed.append(len(cells) - sum(max(r, 0) for r in remaining))
+            if self.free_allowed[ci] < 0:
+                self.failed = True  # More required hours than open periods
+
+        n = len(self.cell_class)
+        self.assigned = [False] * n
+        self.domain = [set() for _ in range(n)]
+        self.support = [[0] * len(subjects) for subjects in self.subjects]
+        self.buckets = {}
+
+        for cid in range(n):
+            ci = self.cell_class[cid]
+            for si in range(len(self.subjects[ci])):
+                if self._valid(cid, si):
+                    self.domain[cid].add(si)
+                    self.support[ci][si] += 1
+            self.buckets.setdefault(len(self.domain[cid]), {})[cid] = None
+
+        for ci in range(len(self.classes)):
+            for si in range(len(self.subjects[ci])):
+                if self.support[ci][si] < self._needed_support(ci, si):
+                    self.failed = True
+            if not self._labs_fit(ci):
+                self.failed = True
+
+        # A faculty cannot take on more hours than the rest of its week allows
+        for faculty, users in self.faculty_users.items():
+            demand = sum(max(self.remaining[ci][si], 0) for ci, si in users)
+            capacity = sum(MAX_HOURS_PER_DAY - faculty.hours_on(day) for day in WORKDAYS)
+            if demand > capacity:
+                self.failed = True
+
+    # --- Constraint checks ---
+
+    def _faculty_free(self, faculty, day, hour):
+        if faculty.is_occupied(day, hour):
+            self.rejections['faculty_clash'] += 1
+            return False
+        if faculty.isfree_score[day][hour] < MIN_FRESHNESS_SCORE:
+            self.rejections['freshness'] += 1
+            return False
+        return True
+
+    def _valid(self, cid, si):
+        """Check whether subject si may start at cell cid in the current state"""
+        ci = self.cell_class[cid]
+        day = self.cell_day[cid]
+        hour = self.cell_hour[cid]
+        block = self.block[ci][si]
+        if self.remaining[ci][si] < block:
+            return False
+
+        faculty = self.faculty_of[ci][si]
+        if faculty.hours_on(day) + block > MAX_HOURS_PER_DAY:
+            self.rejections['daily_max'] += 1
+            return False
+
+        if block > 1:
+            if self.labs_on_day[ci][day] >= LAB_CONSTRAINTS['max_labs_per_day']:
+                self.rejections['labs_per_day'] += 1
+                return False
+            if self.lab_sessions[ci][si] >= LAB_CONSTRAINTS['lab_frequency']:
+                self.rejections['lab_frequency'] += 1
+                return False
+            if hour + block > HOURS_PER_DAY:
+                self.rejections['consecutive_slots'] += 1
+                return False
+            for h in range(hour, hour + block):
+                other = self.cell_at.get((ci, day, h))
+                if other is None or self.assigned[other]:
+                    self.rejections['consecutive_slots'] += 1
+                    return False
+                if not self._faculty_free(faculty, day, h):
+                    return False
+            return True
+
+        return self._faculty_free(faculty, day, hour)
+
+    def _needed_support(self, ci, si):
+        """Open cells that must still offer subject si for its hours to fit"""
+        remaining = self.remaining[ci][si]
+        if self.block[ci][si] > 1:
+            return 1 if remaining >= self.block[ci][si] else 0
+        return max(remaining, 0)
+
+    def _labs_fit(self, ci):
+        """
+        Check that the lab sessions class ci still needs can each get a day:
+        a matching of sessions to days that still offer the lab a start and
+        have room under max_labs_per_day. Support counts alone miss labs
+        whose only starts fall on the same day.
+        """
+        sessions = []
+        for si, block in enumerate(self.block[ci]):
+            if block > 1:
+                sessions += [si] * (max(self.remaining[ci][si], 0) // block)
+        if not sessions:
+            return True
+        room = {day: LAB_CONSTRAINTS['max_labs_per_day'] - self.labs_on_day[ci][day] for day in WORKDAYS}
+        days_of = {si: [day for day in WORKDAYS if room[day] > 0 and
+                        any(not self.assigned[c] and si in self.domain[c]
+                            for c in self.class_day_cells[(ci, day)])]
+                   for si in set(sessions)}
+        seated = {day: [] for day in WORKDAYS}  # Day -> sessions matched to it
+
+        def seat(k, seen):
+            # Augmenting path: a full day may hand one of its sessions to another day
+            for day in days_of[sessions[k]]:
+                if day in seen:
+                    continue
+                seen.add(day)
+                if len(seated[day]) < room[day]:
+                    seated[day].append(k)
+                    return True
+                for i, other in enumerate(seated[day]):
+                    if seat(other, seen):
+                        seated[day][i] = k
+                        return True
+            return False
+
+        if all(seat(k, set()) for k in range(len(sessions))):
+            return True
+        self.rejections['labs_per_day'] += 1
+        return False
+
+    # --- Trailed state changes ---
+
+    def _close(self, cid):
+        """Take a cell out of the open set"""
+        self.assigned[cid] = True
+        ci = self.cell_class[cid]
+        del self.buckets[len(self.domain[cid])][cid]
+        for si in self.domain[cid]:
+            self.support[ci][si] -= 1
+        self.trail.append(('close', cid))
+
+    def _remove(self, cid, si):
+        """Remove a value from an open cell's domain"""
+        domain = self.domain[cid]
+        del self.buckets[len(domain)][cid]
+        domain.discard(si)
+        self.buckets.setdefault(len(domain), {})[cid] = None
+        self.support[self.cell_class[cid]][si] -= 1
+        self.trail.append(('remove', cid, si))
+
+    def _place(self, cid, si):
+        """Place subject si starting at cell cid and record it on the trail"""
+        ci = self.cell_class[cid]
+        day = self.cell_day[cid]
+        hour = self.cell_hour[cid]
+        cells = self.classes[ci].grid.cells
+        start = self.day_start[ci][day]
+        faculty = self.faculty_of[ci][si]
+        hours = list(range(hour, hour + self.block[ci][si]))
+
+        for h in hours:
+            self._close(self.cell_at[(ci, day, h)])
+            cells[start + h] = self.code_of[ci][si]
+            faculty.occupy(day, h)
+
+        self.remaining[ci][si] -= len(hours)
+        self.day_count[ci][si][day] += len(hours)
+        if len(hours) > 1:
+            self.labs_on_day[ci][day] += 1
+            self.lab_sessions[ci][si] += 1
+        self.trail.append(('place', ci, si, day, hours))
+
+    def _undo(self, mark):
+        """Revert every state change recorded after the trail mark"""
+        trail = self.trail
+        while len(trail) > mark:
+            entry = trail.pop()
+            kind = entry[0]
+            if kind == 'remove':
+                _, cid, si = entry
+                domain = self.domain[cid]
+                del self.buckets[len(domain)][cid]
+                domain.add(si)
+                self.buckets.setdefault(len(domain), {})[cid] = None
+                self.support[self.cell_class[cid]][si] += 1
+            elif kind == 'close':
+                cid = entry[1]
+                self.assigned[cid] = False
+                ci = self.cell_class[cid]
+                for si in self.domain[cid]:
+                    self.support[ci][si] += 1
+                self.buckets.setdefault(len(self.domain[cid]), {})[cid] = None
+            elif kind == 'place':
+                _, ci, si, day, hours = entry
+                cells = self.classes[ci].grid.cells
+                start = self.day_start[ci][day]
+                faculty = self.faculty_of[ci][si]
+                for h in hours:
+                    cells[start + h] = FREE_CODE
+                    faculty.release(day, h)
+                self.remaining[ci][si] += len(hours)
+                self.day_count[ci][si][day] -= len(hours)
+                if len(hours) > 1:
+                    self.labs_on_day[ci][day] -= 1
+                    self.lab_sessions[ci][si] -= 1
+            elif kind == 'free':
+                self.free_allowed[entry[1]] += 1
+
+    # --- Propagation ---
+
+    def _coverable(self, cid):
+        """Check whether a lab block starting earlier in the day could still cover cell cid"""
+        ci = self.cell_class[cid]
+        day = self.cell_day[cid]
+        hour = self.cell_hour[cid]
+        for si, block in enumerate(self.block[ci]):
+            for h in range(max(hour - block + 1, 0), hour):
+                start = self.cell_at.get((ci, day, h))
+                if start is not None and not self.assigned[start] and si in self.domain[start]:
+                    return True
+        return False
+
+    def _uncovered(self, ci):
+        """Open cells of a class that nothing can fill any more"""
+        return sum(1 for cid in self.class_cells[ci]
+                   if not self.assigned[cid] and not self.domain[cid] and not self._coverable(cid))
+
+    def _forward_check(self, cells_to_check):
+        """Prune invalid values from the given open cells; False on a wipeout"""
+        touched = set()
+        emptied = set()
+        for cid, values in cells_to_check.items():
+            if self.assigned[cid]:
+                continue
+            ci = self.cell_class[cid]
+            domain = self.domain[cid]
+            for si in [si for si in domain if values is None or si in values]:
+                if not self._valid(cid, si):
+                    self._remove(cid, si)
+                    touched.add((ci, si))
+            if not domain:
+                emptied.add(ci)
+
+        for ci, si in touched:
+            if self.support[ci][si] < self._needed_support(ci, si):
+                return False
+        # Lab starts were pruned: the remaining labs must still get separate days
+        for ci in {ci for ci, si in touched if self.block[ci][si] > 1}:
+            if not self._labs_fit(ci):
+                return False
+        # Every cell nothing can fill must be covered by the free allowance
+        for ci in emptied:
+            if self._uncovered(ci) > self.free_allowed[ci]:
+                return False
+        return True
+
+    def _assign(self, cid, si):
+        """Assign a value to a cell and forward check; False on a dead end"""
+        ci = self.cell_class[cid]
+        day = self.cell_day[cid]
+
+        if si == FREE:
+            self._close(cid)
+            self.free_allowed[ci] -= 1
+            self.trail.append(('free', ci))
+            # Lab blocks spanning this cell are gone
+            if not self._forward_check({c: None for c in self.class_day_cells[(ci, day)]}):
+                return False
+            return self._uncovered(ci) <= self.free_allowed[ci] and self._labs_fit(ci)
+
+        self._place(cid, si)
+
+        # Same class: remaining hours, lab limits and lab windows changed
+        to_check = {c: None for c in self.class_cells[ci]}
+
+        # Same faculty: clash, freshness and daily maximum changed on this day
+        for cj, sj in self.faculty_users[self.faculty_of[ci][si]]:
+            if cj == ci:
+                continue
+            for c in self.class_day_cells[(cj, day)]:
+                values = to_check.get(c)
+                if c not in to_check:
+                    to_check[c] = values = set()
+                if values is not None:
+                    values.add(sj)
+
+        # Closing the placed cells also takes lab starts out of this class
+        return self._forward_check(to_check) and self._labs_fit(ci)
+
+    # --- Search ---
+
+    def _select_cell(self):
+        """
+        Most constrained open cell (smallest non-empty domain), or None when done.
+        Cells with an empty domain are left until last, since a lab block
+        starting in an earlier cell may still cover them.
+        """
+        for size in sorted(self.buckets):
+            bucket = self.buckets[size]
+            if size > 0 and bucket:
+                return next(iter(bucket))
+        bucket = self.buckets.get(0)
+        if bucket:
+            return next(iter(bucket))
+        return None
+
+    def _order_values(self, cid):
+        """Least constraining subjects first, free period last"""
+        ci = self.cell_class[cid]
+        day = self.cell_day[cid]
+        hour = self.cell_hour[cid]
+
+        def conflicts(si):
+            # Open cells in other classes that would lose this faculty
+            count = 0
+            for cj, sj in self.faculty_users[self.faculty_of[ci][si]]:
+                if cj == ci:
+                    continue
+                for h in range(hour, hour + self.block[ci][si]):
+                    other = self.cell_at.get((cj, day, h))
+                    if other is not None and not self.assigned[other] and sj in self.domain[other]:
+                        count += 1
+            return count
+
+        rank = self.rank[ci]
+        day_count = self.day_count[ci]
+        values = sorted(self.domain[cid],
+                        key=lambda si: (conflicts(si), day_count[si][day], rank[si]))
+        if self.free_allowed[ci] > 0:
+            values.append(FREE)
+        return values
+
+    def _restore_best(self, best):
+        """Undo the search and replay the deepest consistent set of placements"""
+        self._undo(0)
+        for cid, value in best:
+            self._assign(cid, value)
+
+    def solve(self):
+        """
+        Run the search. If it fails or runs out of budget, the deepest
+        partial timetable found is left in place and False is returned.
+
+        The search is heavy-tailed: a bad early choice can cost tens of
+        thousands of nodes to dig out of, while a fresh start usually needs
+        a few dozen. So with randomize_order a run is cut off after
+        BACKTRACK_SETTINGS['restart_factor'] nodes per open cell, and the
+        search restarts with reshuffled subject tie-breaks and twice the
+        cutoff. Every run draws on the same budget.
+        """
+        if self.failed:
+            return False
+
+        factor = BACKTRACK_SETTINGS['restart_factor']
+        cutoff = factor * len(self.cell_class) if factor and BACKTRACK_SETTINGS['randomize_order'] else None
+        best = []  # (cell, value) choices of the deepest consistent state so far
+        while True:
+            outcome, best = self._search(best, cutoff)
+            if outcome is not None:
+                if not outcome:
+                    self._restore_best(best)
+                return outcome
+            self.restarts += 1
+            cutoff *= 2
+            self._undo(0)
+            for rank in self.rank:
+                self.rng.shuffle(rank)
+
+    def _search(self, best, cutoff=None):
+        """
+        One run from the current state: (True, best) when solved, (False,
+        best) when the space or the budget is exhausted and (None, best)
+        after `cutoff` nodes
+        """
+        stack = []  # Frames: [cell, ordered values, next value index, trail mark]
+        nodes = 0
+        while True:
+            cid = self._select_cell()
+            if cid is None:
+                return True, best
+            if len(stack) > len(best):
+                best = [(frame[0], frame[1][frame[2] - 1]) for frame in stack]
+            stack.append([cid, self._order_values(cid), 0, len(self.trail)])
+            if len(stack) > self.max_depth:
+                self.max_depth = len(stack)
+
+            # Advance to the next consistent assignment, backtracking as needed
+            while stack:
+                frame = stack[-1]
+                cid, values, index, mark = frame
+                self._undo(mark)
+                if index >= len(values):
+                    stack.pop()
+                    self.backtracks += 1
+                    continue
+
+                frame[2] = index + 1
+                self.nodes += 1
+                nodes += 1
+                if not self.budget.tick():
+                    return False, best
+                if cutoff is not None and nodes > cutoff:
+                    return None, best
+                if self._assign(cid, values[index]):
+                    break
+            else:
+                return False, best
+
+    def stats(self):
+        return {'nodes': self.nodes, 'backtracks': self.backtracks, 'max_depth': self.max_depth,
+                'restarts': self.restarts}
@@ -0,0 +1,209 @@
+"""
+Canvas rendering of timetables for the GUI.
+
+A timetable is one Canvas rather than a Label widget per cell: the grid,
+the legend and the summaries below it are all canvas items. The GUI draws
+a tab the first time it is selected, so the window opens without touching
+any timetable. refresh() compares what each cell shows with the current
+timetable and reconfigures only the cells that changed, so a Recreate or a
+repair updates the view in place instead of rebuilding it.
+
+ClassTimetable shows one class from the school grid; FacultyTimetable
+shows one faculty from its indexed timetable (School.index_faculty_timetables)
+and can be switched to another faculty with show().
+"""
+import tkinter as tk
+from tkinter import ttk
+from models import Labs, FREE_CODE, BREAK_CODE
+from config import WORKDAYS, HOURS_PER_DAY, GUI_SETTINGS
+
+CORE_SUBJECTS = {"Mathematics", "Physics", "Chemistry", "English", "Biology"}
+
+BREAK_COLOUR = GUI_SETTINGS['break_color']
+LAB_COLOUR = GUI_SETTINGS['lab_subject_color']
+CORE_COLOUR = GUI_SETTINGS['core_subject_color']
+OTHER_COLOUR = GUI_SETTINGS['other_subject_color']
+FREE_COLOUR = GUI_SETTINGS['free_period_color']
+
+# Layout in pixels
+PERIOD_WIDTH = 80
+TIME_WIDTH = 150
+CELL_WIDTH = 90
+CELL_HEIGHT = 36
+HEADER_HEIGHT = 30
+MARGIN = 10
+LINE_HEIGHT = 20
+
+
+def subject_colour(subject):
+    if isinstance(subject, Labs):
+        return LAB_COLOUR
+    if subject.get_name() in CORE_SUBJECTS:
+        return CORE_COLOUR
+    return OTHER_COLOUR
+
+
+class TimetableCanvas:
+    """Period and time columns and one cell per (day, period) on a scrollable Canvas"""
+
+    def __init__(self, parent, time_slots, break_periods):
+        self.break_periods = break_periods
+        self.items = {}   # (day, hour) -> (rectangle id, text id)
+        self.shown = {}   # (day, hour) -> key of what the cell shows
+        self.footer = []  # Item ids below the grid
+        self.footer_key = None
+
+        self.canvas = tk.Canvas(parent, background="white", highlightthickness=0)
+        scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self._draw_grid(time_slots)
+
+    def _draw_grid(self, time_slots):
+        canvas = self.canvas
+        bold = ("Arial", 10, "bold")
+        x_time = MARGIN + PERIOD_WIDTH
+        x_days = x_time + TIME_WIDTH
+        canvas.create_text(MARGIN + PERIOD_WIDTH / 2, MARGIN + HEADER_HEIGHT / 2, text="Period", font=bold)
+        canvas.create_text(x_time + TIME_WIDTH / 2, MARGIN + HEADER_HEIGHT / 2, text="Time", font=bold)
+        for d, day in enumerate(WORKDAYS):
+            canvas.create_text(x_days + (d + 0.5) * CELL_WIDTH, MARGIN + HEADER_HEIGHT / 2, text=day, font=bold)
+
+        for hour in range(HOURS_PER_DAY):
+            y = MARGIN + HEADER_HEIGHT + hour * CELL_HEIGHT
+            middle = y + CELL_HEIGHT / 2
+            canvas.create_text(MARGIN + PERIOD_WIDTH / 2, middle, text=f"Period {hour + 1}", font=("Arial", 10))
+            if hour + 1 in self.break_periods:
+                canvas.create_rectangle(x_time + 2, y + 2, x_time + TIME_WIDTH - 2, y + CELL_HEIGHT - 2,
+                                        fill=BREAK_COLOUR, outline="")
+            canvas.create_text(x_time + TIME_WIDTH / 2, middle,
+                               text=time_slots.get(hour + 1, f"Period {hour + 1}"), font=("Arial", 9))
+            for d, day in enumerate(WORKDAYS):
+                x = x_days + d * CELL_WIDTH
+                rectangle = canvas.create_rectangle(x + 2, y + 2, x + CELL_WIDTH - 2, y + CELL_HEIGHT - 2,
+                                                    fill=FREE_COLOUR, outline="black")
+                text = canvas.create_text(x + CELL_WIDTH / 2, middle, text="", justify="center")
+                self.items[(day, hour)] = (rectangle, text)
+                self.shown[(day, hour)] = ()  # Matches no key: every cell is drawn on the first refresh
+
+        self.footer_top = MARGIN + HEADER_HEIGHT + HOURS_PER_DAY * CELL_HEIGHT + MARGIN
+        self.width = x_days + len(WORKDAYS) * CELL_WIDTH + MARGIN
+
+    def set_cell(self, day, hour, key, look):
+        """
+        Show `look`, a (text, colour) callable, unless the cell already shows
+        `key`; returns whether it was redrawn
+        """
+        if self.shown[(day, hour)] == key:
+            return False
+        text, colour = look()
+        rectangle, label = self.items[(day, hour)]
+        self.canvas.itemconfigure(rectangle, fill=colour)
+        self.canvas.itemconfigure(label, text=text)
+        self.shown[(day, hour)] = key
+        return True
+
+    def draw_footer(self, key, sections):
+        """Titled sections of text entries below the grid; redrawn only when key changes"""
+        if key == self.footer_key:
+            return
+        self.footer_key = key
+        canvas = self.canvas
+        for item in self.footer:
+            canvas.delete(item)
+        self.footer = []
+
+        y = self.footer_top
+        for title, entries, columns in sections:
+            self.footer.append(canvas.create_text(MARGIN, y, text=title, anchor="w", font=("Arial", 10, "bold")))
+            width = (self.width - 2 * MARGIN) / columns
+            for i, text in enumerate(entries):
+                self.footer.append(canvas.create_text(MARGIN + (i % columns) * width,
+                                                      y + LINE_HEIGHT * (1 + i // columns), text=text, anchor="w"))
+            y += LINE_HEIGHT * (2 + (len(entries) + columns - 1) // columns)
+        canvas.configure(scrollregion=(0, 0, self.width, y))
+
+
+class ClassTimetable(TimetableCanvas):
+    """One class timetable, with its legend and faculty assignments"""
+
+    def __init__(self, parent, class_obj, time_slots, break_periods):
+        super().__init__(parent, time_slots, break_periods)
+        self.class_obj = class_obj
+        self.refresh()
+
+    def refresh(self):
+        """Redraw the cells whose lesson changed since the last draw; returns how many"""
+        class_obj = self.class_obj
+        grid = class_obj.grid
+        laid_out = grid.laid_out[class_obj.row]
+
+        def look(code):
+            if code == FREE_CODE:
+                return "---", FREE_COLOUR
+            if code == BREAK_CODE:
+                return "BRK", BREAK_COLOUR
+            subject = grid.pairs[code][0]
+            return subject.get_abbreviation(), subject_colour(subject)
+
+        changed = 0
+        used = set()
+        for day in WORKDAYS:
+            start = grid.offset(class_obj.row, day, 0)
+            for hour in range(HOURS_PER_DAY):
+                code = grid.cells[start + hour] if day in laid_out else FREE_CODE
+                if code >= 0:
+                    used.add(grid.pairs[code][0])
+                changed += self.set_cell(day, hour, code, lambda: look(code))
+
+        subjects = sorted(used, key=lambda s: s.get_name())
+        assignments = [f"{s.get_name()}: {class_obj.faculties[s].get_name()}"
+                       for s in subjects if s in class_obj.faculties]
+        legend = ["BRK: Break", "---: Free Period"] + [f"{s.get_abbreviation()}: {s.get_name()}"
+                                                        for s in subjects]
+        self.draw_footer((legend, assignments),
+                         [("Legend", legend, 3), ("Faculty Assignments", assignments, 2)])
+        return changed
+
+
+class FacultyTimetable(TimetableCanvas):
+    """One faculty's week from its indexed timetable, with its teaching load"""
+
+    def __init__(self, parent, faculty, time_slots, break_periods):
+        super().__init__(parent, time_slots, break_periods)
+        self.show(faculty)
+
+    def show(self, faculty):
+        """Switch to another faculty, redrawing only the cells that differ"""
+        self.faculty = faculty
+        return self.refresh()
+
+    def refresh(self):
+        faculty = self.faculty
+
+        def look(lesson, hour):
+            if lesson:
+                class_obj, subject = lesson
+                return f"{class_obj.get_name()}\n{subject.get_abbreviation()}", subject_colour(subject)
+            if hour + 1 in self.break_periods:
+                return "BRK", BREAK_COLOUR
+            return "---", FREE_COLOUR
+
+        changed = 0
+        for day in WORKDAYS:
+            lessons = faculty.timetable.get(day) or [None] * HOURS_PER_DAY
+            for hour in range(HOURS_PER_DAY):
+                lesson = lessons[hour]
+                changed += self.set_cell(day, hour, lesson, lambda: look(lesson, hour))
+
+        summary = faculty.load_summary()
+        load = [f"{day}: {summary['hours_per_day'][day]} hours, "
+                f"lowest freshness {min(summary['freshness'][day])}" for day in WORKDAYS]
+        load.append(f"Total: {summary['total_hours']} hours")
+        subjects = [subject.get_name() for subject in faculty.get_subjects()]
+        self.draw_footer((faculty.get_name(), load, summary['classes']),
+                         [("Teaching Load", load, 2),
+                          ("Classes", summary['classes'] or ["none"], 3),
+                          ("Subjects", subjects, 3)])
+        return changed